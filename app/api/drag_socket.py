@@ -0,0 +1,67 @@
+from bson.objectid import ObjectId
+from bson.errors import InvalidId
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+import db.mongo as mongo_module
+from services.drag_relay import drag_relay
+
+router = APIRouter()
+
+
+@router.websocket("/ws/stores/{store_id}/drag")
+async def drag_socket(websocket: WebSocket, store_id: str, session_id: str):
+    """Live model drags for the members of a store.
+
+    Client messages:
+      {"type": "move", "model": name, "position": [x, y, z], "expectedVersion": n?}
+      {"type": "drop", "model": name, "position": [x, y, z], "expectedVersion": n?}
+    Server messages:
+      {"type": "drag", "moves": [{"model", "position", "userId"}]}  at most DRAG_BROADCAST_HZ
+      {"type": "dropped", "model", "success", "message"}
+    """
+    try:
+        store_oid = ObjectId(store_id)
+    except InvalidId:
+        await websocket.close(code=4404)
+        return
+
+    # Only users who entered the store may drag its models
+    session = await mongo_module.db.store_sessions.find_one(
+        {"store_id": store_oid, "session_id": session_id}, {"user_id": 1}
+    )
+    if not session:
+        await websocket.close(code=4403)
+        return
+
+    await websocket.accept()
+    member = drag_relay.join(store_id, websocket, session["user_id"])
+    try:
+        while True:
+            message = await websocket.receive_json()
+            model_name = message.get("model")
+            position = message.get("position")
+            if not model_name or not isinstance(position, list):
+                continue
+
+            if message.get("type") == "drop":
+                success, result, model = await drag_relay.drop(
+                    store_id, member, model_name, position, message.get("expectedVersion")
+                )
+                frame = {
+                    "type": "dropped",
+                    "model": model_name,
+                    "success": success,
+                    "message": result
+                }
+                if model is not None:
+                    # On a version conflict this is where the model really is
+                    frame["position"] = model.get("position")
+                    frame["version"] = model.get("version", 0)
+                await websocket.send_json(frame)
+            else:
+                drag_relay.move(
+                    store_id, member, model_name, position, message.get("expectedVersion")
+                )
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await drag_relay.leave(store_id, member)
@@ -0,0 +1,78 @@
+import time
+from inspect import isawaitable
+from typing import Any, Callable, Dict, Iterator, Tuple
+from strawberry.extensions import SchemaExtension
+from services.slow_queries import current_operation
+from services.metrics import (
+    graphql_operation_seconds,
+    graphql_operation_errors,
+    graphql_field_seconds,
+    graphql_field_errors,
+)
+
+# (type, field) -> label, or None for fields read straight off the object
+_timed_fields: Dict[Tuple[str, str], Any] = {}
+
+
+def _field_label(info):
+    key = (info.parent_type.name, info.field_name)
+    if key not in _timed_fields:
+        field_def = info.parent_type.fields.get(info.field_name)
+        field = (field_def.extensions or {}).get("strawberry-definition") if field_def else None
+        # Plain attributes cost nothing worth measuring and would flood the histogram
+        has_resolver = getattr(field, "base_resolver", None) is not None
+        _timed_fields[key] = f"{key[0]}.{key[1]}" if has_resolver else None
+    return _timed_fields[key]
+
+
+class GraphQLMetrics(SchemaExtension):
+    """Latency and error metrics per operation and per resolver field.
+
+    Also names the running operation for the Mongo slow-query log.
+    """
+
+    def on_operation(self) -> Iterator[None]:
+        start = time.perf_counter()
+        context = self.execution_context
+        token = current_operation.set(context.operation_name or "anonymous")
+        try:
+            yield
+        finally:
+            current_operation.reset(token)
+        operation = context.operation_name or "anonymous"
+        try:
+            operation_type = context.operation_type.value
+        except Exception:
+            # The document did not parse, so there is no operation
+            operation_type = "invalid"
+
+        graphql_operation_seconds.observe(time.perf_counter() - start, operation, operation_type)
+        result = context.result
+        if context.pre_execution_errors or (result is not None and result.errors):
+            graphql_operation_errors.inc(operation, operation_type)
+
+    async def _await_field(self, result, label: str, start: float):
+        try:
+            return await result
+        except Exception:
+            graphql_field_errors.inc(label)
+            raise
+        finally:
+            graphql_field_seconds.observe(time.perf_counter() - start, label)
+
+    def resolve(self, _next: Callable, root, info, *args, **kwargs) -> Any:
+        label = _field_label(info)
+        if label is None:
+            return _next(root, info, *args, **kwargs)
+
+        start = time.perf_counter()
+        try:
+            result = _next(root, info, *args, **kwargs)
+        except Exception:
+            graphql_field_errors.inc(label)
+            graphql_field_seconds.observe(time.perf_counter() - start, label)
+            raise
+        if isawaitable(result):
+            return self._await_field(result, label, start)
+        graphql_field_seconds.observe(time.perf_counter() - start, label)
+        return result
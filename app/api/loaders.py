@@ -0,0 +1,70 @@
+from typing import Any, Dict, List, Optional
+from bson.objectid import ObjectId
+from bson.errors import InvalidId
+from strawberry.dataloader import DataLoader
+import db.mongo as mongo_module
+
+
+def _object_ids(keys: List[str]) -> List[ObjectId]:
+    ids = []
+    for key in keys:
+        try:
+            ids.append(ObjectId(key))
+        except (InvalidId, TypeError):
+            pass
+    return ids
+
+
+async def _load_by_id(collection: str, keys: List[str]) -> List[Optional[Dict[str, Any]]]:
+    docs = await mongo_module.db[collection].find(
+        {"_id": {"$in": _object_ids(keys)}}
+    ).to_list(length=None)
+    by_id = {str(d["_id"]): d for d in docs}
+    return [by_id.get(str(key)) for key in keys]
+
+
+async def load_stores(keys: List[str]) -> List[Optional[Dict[str, Any]]]:
+    return await _load_by_id("stores", keys)
+
+
+async def load_widgets(keys: List[str]) -> List[Optional[Dict[str, Any]]]:
+    return await _load_by_id("widget_configs", keys)
+
+
+async def load_users(keys: List[str]) -> List[Optional[Dict[str, Any]]]:
+    return await _load_by_id("users", keys)
+
+
+async def load_widgets_by_domain(keys: List[str]) -> List[Optional[Dict[str, Any]]]:
+    docs = await mongo_module.db.widget_configs.find(
+        {"domain": {"$in": keys}, "is_active": True}
+    ).to_list(length=None)
+    by_domain = {d["domain"]: d for d in docs}
+    return [by_domain.get(key) for key in keys]
+
+
+class Loaders:
+    """Per-request DataLoaders; each batches its keys into one $in query."""
+
+    def __init__(self):
+        self.store_by_id = DataLoader(load_fn=load_stores)
+        self.widget_by_id = DataLoader(load_fn=load_widgets)
+        self.widget_by_domain = DataLoader(load_fn=load_widgets_by_domain)
+        self.user_by_id = DataLoader(load_fn=load_users)
+
+
+async def get_context() -> Dict[str, Any]:
+    return {"loaders": Loaders()}
+
+
+def get_loaders(info) -> Loaders:
+    """Loaders from the request context, or a fresh set when executed without one."""
+    if isinstance(info.context, dict):
+        return info.context.setdefault("loaders", Loaders())
+    return Loaders()
+
+
+def reset_loaders(info):
+    """Drop memoized documents, e.g. between ticks of a long-lived subscription."""
+    if isinstance(info.context, dict):
+        info.context["loaders"] = Loaders()
@@ -0,0 +1,164 @@
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, Optional
+from graphql import DocumentNode, GraphQLError, parse
+from strawberry.extensions import SchemaExtension
+from core.config import settings
+
+
+def query_hash(query: str) -> str:
+    return hashlib.sha256(query.encode("utf-8")).hexdigest()
+
+
+class QueryRegistry:
+    """Query text and parsed documents keyed by the sha256 of the query.
+
+    Queries registered at startup form the allowlist and are never evicted;
+    everything else lives in a bounded LRU.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._queries: "OrderedDict[str, str]" = OrderedDict()
+        self._allowlist: Dict[str, str] = {}
+        # hash -> (document, passed validation)
+        self._documents: "OrderedDict[str, tuple[DocumentNode, bool]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.not_found = 0
+
+    def _bound(self, entries: OrderedDict):
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+
+    def register(self, queries: Dict[str, str]):
+        for digest, query in queries.items():
+            if query_hash(query) != digest:
+                raise ValueError(f"Hash mismatch for persisted query {digest}")
+            self._allowlist[digest] = query
+
+    def is_allowed(self, digest: str) -> bool:
+        return digest in self._allowlist
+
+    def get_query(self, digest: str) -> Optional[str]:
+        query = self._allowlist.get(digest)
+        if query is None:
+            query = self._queries.get(digest)
+            if query is not None:
+                self._queries.move_to_end(digest)
+        if query is None:
+            self.not_found += 1
+        return query
+
+    def put_query(self, digest: str, query: str):
+        if digest in self._allowlist:
+            return
+        self._queries[digest] = query
+        self._queries.move_to_end(digest)
+        self._bound(self._queries)
+
+    def get_document(self, digest: str) -> Optional[tuple[DocumentNode, bool]]:
+        item = self._documents.get(digest)
+        if item is None:
+            self.misses += 1
+            return None
+        self._documents.move_to_end(digest)
+        self.hits += 1
+        return item
+
+    def put_document(self, digest: str, document: DocumentNode, validated: bool = False):
+        self._documents[digest] = (document, validated)
+        self._documents.move_to_end(digest)
+        self._bound(self._documents)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "allowlisted": len(self._allowlist),
+            "queries": len(self._queries),
+            "documents": len(self._documents),
+            "document_hits": self.hits,
+            "document_misses": self.misses,
+            "persisted_not_found": self.not_found,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+query_registry = QueryRegistry(max_entries=settings.PERSISTED_QUERIES_MAX_ENTRIES)
+
+
+def load_allowlist(path: str) -> int:
+    """Register queries from a JSON file: {sha256: query} or a list of queries."""
+    with open(path) as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        data = {query_hash(query): query for query in data}
+    query_registry.register(data)
+    for digest, query in data.items():
+        query_registry.put_document(digest, parse(query))
+    return len(data)
+
+
+class PersistedQueries(SchemaExtension):
+    """Automatic persisted queries plus a parsed and validated document cache.
+
+    Follows the Apollo APQ protocol: the client sends
+    extensions.persistedQuery.sha256Hash, with the query text only when the
+    server answered PersistedQueryNotFound.
+    """
+
+    def on_operation(self) -> Iterator[None]:
+        context = self.execution_context
+        extensions = context.operation_extensions or {}
+        persisted = extensions.get("persistedQuery")
+
+        if persisted:
+            digest = persisted.get("sha256Hash")
+            if context.query:
+                if query_hash(context.query) != digest:
+                    raise GraphQLError(
+                        "provided sha does not match query",
+                        extensions={"code": "PERSISTED_QUERY_HASH_MISMATCH"}
+                    )
+            else:
+                context.query = query_registry.get_query(digest)
+                if context.query is None:
+                    raise GraphQLError(
+                        "PersistedQueryNotFound",
+                        extensions={"code": "PERSISTED_QUERY_NOT_FOUND"}
+                    )
+        elif context.query:
+            digest = query_hash(context.query)
+        else:
+            digest = None
+
+        if digest is not None:
+            if settings.PERSISTED_QUERIES_ALLOWLIST_ONLY and not query_registry.is_allowed(digest):
+                raise GraphQLError(
+                    "Operation is not on the allowlist",
+                    extensions={"code": "PERSISTED_QUERY_NOT_ALLOWED"}
+                )
+            query_registry.put_query(digest, context.query)
+        self._digest = digest
+        yield
+
+    def on_parse(self) -> Iterator[None]:
+        context = self.execution_context
+        cached = query_registry.get_document(self._digest) if self._digest else None
+        if cached is not None:
+            context.graphql_document, self._validated = cached
+        else:
+            self._validated = False
+        yield
+        if cached is None and self._digest and context.graphql_document is not None:
+            query_registry.put_document(self._digest, context.graphql_document)
+
+    def on_validate(self) -> Iterator[None]:
+        context = self.execution_context
+        if self._validated:
+            # Validation rules are fixed per schema, so a document stays valid
+            context.pre_execution_errors = []
+        yield
+        if not self._validated and not context.pre_execution_errors and self._digest:
+            query_registry.put_document(self._digest, context.graphql_document, validated=True)
@@ -0,0 +1,180 @@
+from typing import Any, Dict, Iterator, Optional
+import strawberry
+from graphql import (
+    FieldNode,
+    FragmentSpreadNode,
+    GraphQLError,
+    GraphQLList,
+    GraphQLNonNull,
+    InlineFragmentNode,
+    OperationDefinitionNode,
+    get_named_type,
+    is_composite_type,
+    value_from_ast_untyped,
+)
+from strawberry.extensions import SchemaExtension
+from strawberry.schema_directive import Location
+from core.config import settings
+
+
+@strawberry.schema_directive(locations=[Location.FIELD_DEFINITION])
+class Cost:
+    """Static cost of resolving a field; list_size overrides the assumed list length."""
+    weight: int = 1
+    list_size: Optional[int] = None
+
+
+def _cost_hint(field_def) -> Optional[Cost]:
+    field = (field_def.extensions or {}).get("strawberry-definition")
+    for directive in getattr(field, "directives", ()):
+        if isinstance(directive, Cost):
+            return directive
+    return None
+
+
+def _is_list(graphql_type) -> bool:
+    if isinstance(graphql_type, GraphQLNonNull):
+        graphql_type = graphql_type.of_type
+    return isinstance(graphql_type, GraphQLList)
+
+
+class _CostCalculator:
+    def __init__(self, schema, fragments, variables):
+        self.schema = schema
+        self.fragments = fragments
+        self.variables = variables or {}
+        self.max_depth = 0
+        self._spreading: set = set()
+
+    def _page_size(self, node: FieldNode) -> Optional[int]:
+        for argument in node.arguments:
+            if argument.name.value == "first":
+                first = value_from_ast_untyped(argument.value, self.variables)
+                if isinstance(first, int):
+                    return max(first, 1)
+        return None
+
+    def selection_set(
+        self, selection_set, parent_type, depth: int, page_size: Optional[int] = None
+    ) -> int:
+        self.max_depth = max(self.max_depth, depth)
+        total = 0
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                total += self.field(selection, parent_type, depth, page_size)
+            elif isinstance(selection, InlineFragmentNode):
+                fragment_type = parent_type
+                if selection.type_condition is not None:
+                    fragment_type = self.schema.get_type(selection.type_condition.name.value)
+                total += self.selection_set(
+                    selection.selection_set, fragment_type, depth, page_size
+                )
+            elif isinstance(selection, FragmentSpreadNode):
+                fragment = self.fragments.get(selection.name.value)
+                # Cyclic spreads are left for validation to reject
+                if fragment is None or fragment in self._spreading:
+                    continue
+                self._spreading.add(fragment)
+                fragment_type = self.schema.get_type(fragment.type_condition.name.value)
+                total += self.selection_set(
+                    fragment.selection_set, fragment_type, depth, page_size
+                )
+                self._spreading.discard(fragment)
+        return total
+
+    def field(
+        self, node: FieldNode, parent_type, depth: int, page_size: Optional[int] = None
+    ) -> int:
+        name = node.name.value
+        field_def = getattr(parent_type, "fields", {}).get(name)
+        if field_def is None:
+            # Introspection, or a field validation is about to reject
+            return 0
+        hint = _cost_hint(field_def)
+        field_type = get_named_type(field_def.type)
+
+        # Every aliased copy of a field is resolved again, so each counts in full
+        weight = hint.weight if hint is not None else int(is_composite_type(field_type))
+        if node.selection_set is None:
+            return weight
+
+        # Paginated fields are bounded by the page size they ask for, which also
+        # covers the list inside a page object such as StoreSummaryPage.items
+        first = self._page_size(node)
+        if not _is_list(field_def.type):
+            return weight + self.selection_set(
+                node.selection_set, field_type, depth + 1, first or page_size
+            )
+
+        children = self.selection_set(node.selection_set, field_type, depth + 1)
+        if first or page_size:
+            list_size = first or page_size
+        elif hint is not None and hint.list_size is not None:
+            list_size = hint.list_size
+        else:
+            list_size = settings.QUERY_COST_DEFAULT_LIST_SIZE
+        return weight + children * list_size
+
+
+def operation_cost(schema, document, operation_name=None, variables=None) -> tuple[int, int]:
+    """Static (cost, depth) of the operation that will run."""
+    fragments = {}
+    operation = None
+    for definition in document.definitions:
+        if isinstance(definition, OperationDefinitionNode):
+            if operation_name is None or (
+                definition.name is not None and definition.name.value == operation_name
+            ):
+                operation = operation or definition
+        else:
+            fragments[definition.name.value] = definition
+    if operation is None:
+        return 0, 0
+
+    calculator = _CostCalculator(schema, fragments, variables)
+    root_type = schema.get_root_type(operation.operation)
+    cost = calculator.selection_set(operation.selection_set, root_type, 1)
+    return cost, calculator.max_depth
+
+
+class QueryCostLimiter(SchemaExtension):
+    """Rejects operations over QUERY_MAX_COST or QUERY_MAX_DEPTH.
+
+    The computed cost is reported under extensions.cost of every response.
+    """
+
+    def on_validate(self) -> Iterator[None]:
+        # Runs before validation: errors set here are returned instead of executing
+        context = self.execution_context
+        self._cost = None
+        if context.pre_execution_errors or context.graphql_document is None:
+            yield
+            return
+
+        cost, depth = operation_cost(
+            context.schema._schema,
+            context.graphql_document,
+            context.operation_name,
+            context.variables
+        )
+        self._cost = cost
+        errors = []
+        if cost > settings.QUERY_MAX_COST:
+            errors.append(GraphQLError(
+                f"Query cost {cost} exceeds the limit of {settings.QUERY_MAX_COST}",
+                extensions={"code": "QUERY_TOO_COSTLY"}
+            ))
+        if depth > settings.QUERY_MAX_DEPTH:
+            errors.append(GraphQLError(
+                f"Query depth {depth} exceeds the limit of {settings.QUERY_MAX_DEPTH}",
+                extensions={"code": "QUERY_TOO_DEEP"}
+            ))
+        if errors:
+            context.pre_execution_errors = errors
+        yield
+
+    def get_results(self) -> Dict[str, Any]:
+        cost = getattr(self, "_cost", None)
+        if cost is None:
+            return {}
+        return {"cost": {"requested": cost, "limit": settings.QUERY_MAX_COST}}
@@ -0,0 +1,169 @@
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, Optional
+import strawberry
+from fastapi import Request
+from fastapi.responses import Response
+from graphql import GraphQLSchema, TypeInfo, TypeInfoVisitor, Visitor, visit
+from strawberry.extensions import SchemaExtension
+from strawberry.schema_directive import Location
+from strawberry.types.graphql import OperationType
+from core.config import settings
+
+
+@strawberry.schema_directive(locations=[Location.FIELD_DEFINITION])
+class CacheControl:
+    """How long a field's value may be served from a cache, in seconds."""
+    max_age: int
+
+
+def _field_max_age(field_def) -> Optional[int]:
+    field = (field_def.extensions or {}).get("strawberry-definition")
+    for directive in getattr(field, "directives", ()):
+        if isinstance(directive, CacheControl):
+            return directive.max_age
+    return None
+
+
+def operation_max_age(schema: GraphQLSchema, document) -> int:
+    """Smallest max_age hinted on the selected fields; 0 if a root field has no hint.
+
+    Nested fields without a hint inherit from their parent, so only volatile
+    fields need to declare a shorter one.
+    """
+    type_info = TypeInfo(schema)
+    ages = []
+
+    class HintCollector(Visitor):
+        def enter_field(self, node, *_):
+            if node.name.value.startswith("__"):
+                return
+            field_def = type_info.get_field_def()
+            if field_def is None:
+                return
+            max_age = _field_max_age(field_def)
+            if max_age is None and type_info.get_parent_type() is schema.query_type:
+                max_age = 0
+            if max_age is not None:
+                ages.append(max_age)
+
+    visit(document, TypeInfoVisitor(type_info, HintCollector()))
+    return min(ages, default=0)
+
+
+class CacheHints(SchemaExtension):
+    """Works out how long a GET query result may be cached from the field hints."""
+
+    def on_execute(self) -> Iterator[None]:
+        yield
+        context = self.execution_context
+        request = context.context.get("request") if isinstance(context.context, dict) else None
+        if request is None or request.method != "GET":
+            return
+        if context.operation_type != OperationType.QUERY or context.pre_execution_errors:
+            return
+        request.state.cache_max_age = operation_max_age(
+            context.schema._schema, context.graphql_document
+        )
+
+
+class ResponseCache:
+    """In-memory LRU of serialized GET /graphql responses, each with its own TTL."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple[float, bytes, str]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def get(self, key: str) -> Optional[tuple[float, bytes, str]]:
+        item = self._entries.get(key)
+        if item is None or item[0] < time.monotonic():
+            if item is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return item
+
+    def put(self, key: str, body: bytes, max_age: int) -> tuple[float, bytes, str]:
+        etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        item = (time.monotonic() + max_age, body, etag)
+        self._entries[key] = item
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return item
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+response_cache = ResponseCache(max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES)
+
+
+def _cache_key(request: Request) -> Optional[str]:
+    """Key for a GET persisted query, or None if the request is not cacheable."""
+    params = request.query_params
+    try:
+        extensions = json.loads(params.get("extensions") or "{}")
+        variables = json.loads(params.get("variables") or "{}")
+    except ValueError:
+        return None
+    digest = (extensions.get("persistedQuery") or {}).get("sha256Hash")
+    if not digest:
+        return None
+    return json.dumps([digest, params.get("operationName"), variables], sort_keys=True)
+
+
+def _respond(item: tuple[float, bytes, str], if_none_match: Optional[str]) -> Response:
+    expires_at, body, etag = item
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={max(0, int(expires_at - time.monotonic()))}",
+        # CORS headers depend on the requesting origin
+        "Vary": "Origin",
+    }
+    if if_none_match and (
+        if_none_match.strip() == "*"
+        or etag in (tag.strip() for tag in if_none_match.split(","))
+    ):
+        response_cache.not_modified += 1
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+async def cache_graphql_get(request: Request, call_next):
+    """HTTP middleware: TTL cache and ETag/304 for GET persisted queries on /graphql."""
+    if request.method != "GET" or request.url.path != "/graphql":
+        return await call_next(request)
+    key = _cache_key(request)
+    if key is None:
+        return await call_next(request)
+
+    item = response_cache.get(key)
+    if item is None:
+        response = await call_next(request)
+        max_age = getattr(request.state, "cache_max_age", 0)
+        if response.status_code != 200 or not max_age:
+            return response
+
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        if json.loads(body).get("errors"):
+            return Response(
+                content=body, status_code=response.status_code, media_type="application/json"
+            )
+        item = response_cache.put(key, body, max_age)
+
+    return _respond(item, request.headers.get("if-none-match"))
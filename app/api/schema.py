@@ -1,8 +1,14 @@
 import strawberry
+from strawberry.schema.config import StrawberryConfig
+from core.config import settings
 from api.user_schema import Query as UserQuery, Mutation as UserMutation
 from api.store_schema import Query as StoreQuery, Mutation as StoreMutation
 from api.widget_schema import WidgetQuery, WidgetMutation
 from api.store_subscriptions import Subscription as StoreSubscription
+from api.persisted_queries import PersistedQueries
+from api.response_cache import CacheHints
+from api.query_cost import QueryCostLimiter
+from api.instrumentation import GraphQLMetrics
 
 @strawberry.type
 class Query(UserQuery, StoreQuery, WidgetQuery):
@@ -16,4 +22,13 @@ class Mutation(UserMutation, StoreMutation, WidgetMutation):
 class Subscription(StoreSubscription):
     pass
 
-combined_schema = strawberry.Schema(query=Query, mutation=Mutation, subscription=Subscription)
+combined_schema = strawberry.Schema(
+    query=Query,
+    mutation=Mutation,
+    subscription=Subscription,
+    extensions=[GraphQLMetrics, PersistedQueries, CacheHints, QueryCostLimiter],
+    # POST /graphql also accepts a JSON array of operations, run concurrently
+    config=StrawberryConfig(
+        batching_config={"max_operations": settings.GRAPHQL_MAX_BATCH_SIZE}
+    )
+)
@@ -1,12 +1,29 @@
 
 import strawberry
+from datetime import datetime
 from typing import List, Optional
 # from middleware.auth_middleware import authmanager
 import db.mongo as mongo_module
 from services.store import store_service
+from services.heartbeat_buffer import heartbeat_buffer
 from core.config import settings
+from utils.projection import selected_paths, build_projection
+from api.loaders import get_loaders
+from api.response_cache import CacheControl
+from api.query_cost import Cost
 
 BackEND_URL = settings.BACKEND_URL
+MAX_PAGE_SIZE = 100
+# Cache hints, in seconds, for GET persisted queries
+CATALOG_MAX_AGE = 30
+LIVE_MAX_AGE = 5
+
+# GraphQL fields that are not read straight from the store document
+STORE_FIELD_MAP = {
+    "id": None,
+    "sessionId": None,
+    "installedWidgetDomain": "installed_widget_id",
+}
 
 
 def normalize_image_url(image_url: str) -> str:
@@ -30,9 +47,61 @@ def normalize_model_url(model_url: str) -> str:
 class Model:
     name: str
     glb_url: str
-    position: List[float]
+    position: List[float] = strawberry.field(directives=[CacheControl(max_age=LIVE_MAX_AGE)])
     size: List[float]
     entrance_order: int
+    version: int = strawberry.field(default=0, directives=[CacheControl(max_age=LIVE_MAX_AGE)])
+
+
+@strawberry.input
+class ModelMoveInput:
+    name: str
+    position: List[float]
+    expected_version: Optional[int] = None
+
+
+@strawberry.type
+class MovedModel:
+    name: str
+    position: List[float]
+    version: int = 0
+    last_moved_by: Optional[str] = None
+    last_moved_at: Optional[datetime] = None
+
+
+@strawberry.type
+class ModelMoveResult:
+    """Outcome of one move; model holds the current state even when not moved."""
+    moved: bool
+    message: str
+    model: MovedModel
+
+
+@strawberry.type
+class ModelMovesResult:
+    moved: List[MovedModel]
+    conflicts: List[MovedModel]
+
+
+def build_moved_model(m: dict) -> MovedModel:
+    return MovedModel(
+        name=m["name"],
+        position=m.get("position", [0, 0]),
+        version=m.get("version", 0),
+        last_moved_by=m.get("last_moved_by"),
+        last_moved_at=m.get("last_moved_at")
+    )
+
+
+def build_model(m: dict) -> "Model":
+    return Model(
+        name=m.get("name", ""),
+        glb_url=normalize_model_url(m.get("glb_url", "")),
+        position=m.get("position", [0, 0]),
+        size=m.get("size", [1, 1, 1]),
+        entrance_order=m.get("entrance_order", 0),
+        version=m.get("version", 0)
+    )
 
 
 @strawberry.type
@@ -42,68 +111,101 @@ class Store:
     description: str
     image_url: str
     models: List[Model]
-    active_user_count: int = 0
+    active_user_count: int = strawberry.field(
+        default=0, directives=[CacheControl(max_age=LIVE_MAX_AGE)]
+    )
     session_id: Optional[str] = None
     installed_widget_id: Optional[str] = None
-    installed_widget_domain: Optional[str] = None 
+
+    @strawberry.field
+    async def installed_widget_domain(self, info) -> Optional[str]:
+        if not self.installed_widget_id:
+            return None
+        widget = await get_loaders(info).widget_by_id.load(self.installed_widget_id)
+        return widget.get("domain") if widget else None
+
+
+def build_store(s: dict, session_id: Optional[str] = None) -> Store:
+    return Store(
+        id=s["id"],
+        name=s.get("name", ""),
+        description=s.get("description", ""),
+        image_url=normalize_image_url(s.get("image_url", "")),
+        models=[build_model(m) for m in s.get("models", [])],
+        active_user_count=s.get("active_user_count", 0),
+        session_id=session_id,
+        installed_widget_id=s.get("installed_widget_id")
+    )
+
+
+def store_projection(info) -> dict:
+    return build_projection(selected_paths(info), STORE_FIELD_MAP)
 
 
 @strawberry.type
-class Query:
+class StoreSummary:
+    id: str
+    name: str
+    image_url: str
+    active_user_count: int = strawberry.field(
+        default=0, directives=[CacheControl(max_age=LIVE_MAX_AGE)]
+    )
+
     @strawberry.field
-    async def get_all_stores(self) -> List[Store]:
+    async def models(self, info) -> List[Model]:
+        """Loaded only when the client selects it, batched across the page."""
+        store = await get_loaders(info).store_by_id.load(self.id)
+        return [build_model(m) for m in store.get("models", [])] if store else []
+
+
+@strawberry.type
+class StoreSummaryPage:
+    items: List[StoreSummary]
+    end_cursor: Optional[str] = None
+    has_next_page: bool = False
+
+
+@strawberry.type
+class Query:
+    @strawberry.field(directives=[CacheControl(max_age=CATALOG_MAX_AGE), Cost(weight=2)])
+    async def get_store_summaries(
+        self, first: int = 20, after: Optional[str] = None
+    ) -> StoreSummaryPage:
         db = mongo_module.db
         store_service.set_db(db)
-        stores = await store_service.get_all_stores()
-        return [
-            Store(
+        stores, has_next_page = await store_service.list_store_summaries(
+            max(1, min(first, MAX_PAGE_SIZE)), after
+        )
+        items = [
+            StoreSummary(
                 id=s["id"],
                 name=s["name"],
-                description=s.get("description", ""),
                 image_url=normalize_image_url(s.get("image_url", "")),
-                models=[
-                    Model(
-                        name=m.get("name", ""),
-                        glb_url=normalize_model_url(m.get("glb_url", "")),
-                        position=m.get("position", [0, 0]),
-                        size=m.get("size", [1, 1, 1]),
-                        entrance_order=m.get("entrance_order", 0)
-                    )
-                    for m in s.get("models", [])
-                ],
-                active_user_count=s.get("active_user_count", 0),
-                installed_widget_id=s.get("installed_widget_id"),
-                installed_widget_domain=s.get("installed_widget_domain")
+                active_user_count=s.get("active_user_count", 0)
             )
             for s in stores
         ]
+        return StoreSummaryPage(
+            items=items,
+            end_cursor=items[-1].id if items else None,
+            has_next_page=has_next_page
+        )
 
-    @strawberry.field
-    async def get_store_by_id(self, store_id: str) -> Optional[Store]:
+    @strawberry.field(directives=[CacheControl(max_age=CATALOG_MAX_AGE), Cost(weight=10)])
+    async def get_all_stores(self, info) -> List[Store]:
+        db = mongo_module.db
+        store_service.set_db(db)
+        stores = await store_service.get_all_stores(store_projection(info))
+        return [build_store(s) for s in stores]
+
+    @strawberry.field(directives=[CacheControl(max_age=CATALOG_MAX_AGE), Cost(weight=2)])
+    async def get_store_by_id(self, store_id: str, info) -> Optional[Store]:
         db = mongo_module.db
         store_service.set_db(db)
-        s = await store_service.get_store_by_id(store_id)
+        s = await store_service.get_store_by_id(store_id, store_projection(info))
         if not s:
             return None
-        return Store(
-            id=s["id"],
-            name=s["name"],
-            description=s.get("description", ""),
-            image_url=normalize_image_url(s.get("image_url", "")),
-            models=[
-                Model(
-                    name=m.get("name", ""),
-                    glb_url=normalize_model_url(m.get("glb_url", "")),
-                    position=m.get("position", [0, 0]),
-                    size=m.get("size", [1, 1, 1]),
-                    entrance_order=m.get("entrance_order", 0)
-                )
-                for m in s.get("models", [])
-            ],
-            active_user_count=s.get("active_user_count", 0),
-            installed_widget_id=s.get("installed_widget_id"),
-            installed_widget_domain=s.get("installed_widget_domain")
-        )
+        return build_store(s)
 
 @strawberry.type
 class Mutation:
@@ -117,120 +219,111 @@ class Mutation:
             raise Exception(result)
         
         session_id = result
+        heartbeat_buffer.track(store_id, session_id)
         
-        s = await store_service.get_store_by_id(store_id)
-        return Store(
-            id=s["id"],
-            name=s["name"],
-            description=s.get("description", ""),
-            image_url=normalize_image_url(s.get("image_url", "")),
-            models=[
-                Model(
-                    name=m.get("name", ""),
-                    glb_url=normalize_model_url(m.get("glb_url", "")),
-                    position=m.get("position", [0, 0]),
-                    size=m.get("size", [1, 1, 1]),
-                    entrance_order=m.get("entrance_order", 0)
-                )
-                for m in s.get("models", [])
-            ],
-            active_user_count=s.get("active_user_count", 0),
-            session_id=session_id,
-            installed_widget_id=s.get("installed_widget_id"),
-            installed_widget_domain=s.get("installed_widget_domain")
-        )
+        s = await store_service.get_store_by_id(store_id, store_projection(info))
+        return build_store(s, session_id=session_id)
 
     @strawberry.mutation
-    async def exit_store(self, store_id: str, session_id: str) -> Store:
+    async def exit_store(self, store_id: str, session_id: str, info) -> Store:
         db = mongo_module.db
         store_service.set_db(db)
         
+        heartbeat_buffer.forget(store_id, session_id)
         await store_service.exit_store(store_id, session_id)
         
-        s = await store_service.get_store_by_id(store_id)
+        s = await store_service.get_store_by_id(store_id, store_projection(info))
         if not s:
             raise Exception(f"Store {store_id} not found")
         
-        return Store(
-            id=s["id"],
-            name=s["name"],
-            description=s.get("description", ""),
-            image_url=normalize_image_url(s.get("image_url", "")),
-            models=[
-                Model(
-                    name=m.get("name", ""),
-                    glb_url=normalize_model_url(m.get("glb_url", "")),
-                    position=m.get("position", [0, 0]),
-                    size=m.get("size", [1, 1, 1]),
-                    entrance_order=m.get("entrance_order", 0)
-                )
-                for m in s.get("models", [])
-            ],
-            active_user_count=s.get("active_user_count", 0),
-            installed_widget_id=s.get("installed_widget_id"),
-            installed_widget_domain=s.get("installed_widget_domain")
-        )
+        return build_store(s)
+
+    @strawberry.mutation
+    async def heartbeat(self, store_id: str, session_id: str) -> bool:
+        heartbeat_buffer.set_db(mongo_module.db)
+        return await heartbeat_buffer.heartbeat(store_id, session_id)
 
     @strawberry.mutation
     async def install_widget(self, store_id: str, widget_id: str, info) -> Store:
         db = mongo_module.db
         store_service.set_db(db)
         
-        s = await store_service.install_widget(store_id, widget_id)
+        s = await store_service.install_widget(store_id, widget_id, store_projection(info))
         if not s:
             raise Exception(f"Failed to install widget on store {store_id}")
         
-        return Store(
-            id=s["id"],
-            name=s["name"],
-            description=s.get("description", ""),
-            image_url=normalize_image_url(s.get("image_url", "")),
-            models=[
-                Model(
-                    name=m.get("name", ""),
-                    glb_url=normalize_model_url(m.get("glb_url", "")),
-                    position=m.get("position", [0, 0]),
-                    size=m.get("size", [1, 1, 1]),
-                    entrance_order=m.get("entrance_order", 0)
-                )
-                for m in s.get("models", [])
-            ],
-            active_user_count=s.get("active_user_count", 0),
-            installed_widget_id=s.get("installed_widget_id"),
-            installed_widget_domain=s.get("installed_widget_domain")
-        )
+        return build_store(s)
 
     @strawberry.mutation
     async def update_model_position(
-        self, store_id: str, model_name: str, position: List[float], user_id: str, info
+        self,
+        store_id: str,
+        model_name: str,
+        position: List[float],
+        user_id: str,
+        info,
+        expected_version: Optional[int] = None
     ) -> Store:
         db = mongo_module.db
         store_service.set_db(db)
         
-        success, message = await store_service.update_model_position(store_id, model_name, position, user_id)
+        success, message, _ = await store_service.update_model_position(
+            store_id, model_name, position, user_id, expected_version
+        )
         
         if not success:
             raise Exception(f"Failed to update position: {message}")
         
-        s = await store_service.get_store_by_id(store_id)
+        s = await store_service.get_store_by_id(store_id, store_projection(info))
         if not s:
             raise Exception(f"Store {store_id} not found after update")
-        return Store(
-            id=s["id"],
-            name=s["name"],
-            description=s.get("description", ""),
-            image_url=normalize_image_url(s.get("image_url", "")),
-            models=[
-                Model(
-                    name=m.get("name", ""),
-                    glb_url=normalize_model_url(m.get("glb_url", "")),
-                    position=m.get("position", [0, 0]),
-                    size=m.get("size", [1, 1, 1]),
-                    entrance_order=m.get("entrance_order", 0)
-                )
-                for m in s.get("models", [])
+        return build_store(s)
+
+    @strawberry.mutation
+    async def move_model(
+        self,
+        store_id: str,
+        model_name: str,
+        position: List[float],
+        user_id: str,
+        expected_version: Optional[int] = None
+    ) -> ModelMoveResult:
+        db = mongo_module.db
+        store_service.set_db(db)
+
+        success, message, model = await store_service.update_model_position(
+            store_id, model_name, position, user_id, expected_version
+        )
+        if model is None:
+            raise Exception(f"Failed to update position: {message}")
+
+        # A version conflict is not an error: the current state comes back as data
+        return ModelMoveResult(moved=success, message=message, model=build_moved_model(model))
+
+    @strawberry.mutation
+    async def update_model_positions(
+        self, store_id: str, moves: List[ModelMoveInput], user_id: str
+    ) -> ModelMovesResult:
+        db = mongo_module.db
+        store_service.set_db(db)
+
+        result = await store_service.update_model_positions(
+            store_id,
+            [
+                {
+                    "name": move.name,
+                    "position": move.position,
+                    "expected_version": move.expected_version
+                }
+                for move in moves
             ],
-            active_user_count=s.get("active_user_count", 0),
-            installed_widget_id=s.get("installed_widget_id"),
-            installed_widget_domain=s.get("installed_widget_domain")
+            user_id
+        )
+        if result is None:
+            raise Exception(f"Store {store_id} not found")
+
+        moved, conflicts = result
+        return ModelMovesResult(
+            moved=[build_moved_model(m) for m in moved],
+            conflicts=[build_moved_model(m) for m in conflicts]
         )
@@ -1,95 +1,129 @@
 import strawberry
-import asyncio
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Dict, List, Optional
 import db.mongo as mongo_module
 from services.store import store_service
-from api.store_schema import Store, Model
-from core.config import settings
+from services.store_events import store_events
+from services.lobby_occupancy import lobby_occupancy
+from api.store_schema import Store, Model, build_store, build_model, store_projection
+from api.loaders import reset_loaders
 
-BackEND_URL = settings.BACKEND_URL
 
-def normalize_image_url(image_url: str) -> str:
-    if not image_url:
-        return ""
-    if image_url.startswith("http"):
-        return image_url
-    clean_path = image_url.lstrip("./").lstrip("../")
-    return f"{BackEND_URL}/{clean_path}"
+@strawberry.type
+class StoreChange:
+    """A full snapshot on subscribe/resync, otherwise only the fields that changed."""
+    seq: int
+    store_id: str
+    snapshot: Optional[Store] = None
+    models: List[Model] = strawberry.field(default_factory=list)
+    active_user_count: Optional[int] = None
+    installed_widget_id: Optional[str] = None
+
+
+@strawberry.type
+class StoreOccupancy:
+    store_id: str
+    count: int
+
+
+def _connection(info):
+    """The websocket serving the subscription, if the context carries one."""
+    if isinstance(info.context, dict):
+        return info.context.get("request")
+    return None
+
 
+def _models_by_name(s: dict) -> Dict[str, dict]:
+    return {m.get("name"): m for m in s.get("models", [])}
 
-def normalize_model_url(model_url: str) -> str:
-    if not model_url:
-        return ""
-    if model_url.startswith("http"):
-        return model_url
-    clean_path = model_url.lstrip("./").lstrip("../").lstrip("/")
-    return f"{BackEND_URL}/{clean_path}"
 
+def _diff_store(seq: int, previous: dict, current: dict) -> Optional[StoreChange]:
+    """Delta between two store reads, a snapshot if the model set changed, or None."""
+    previous_models = _models_by_name(previous)
+    current_models = _models_by_name(current)
+    if previous_models.keys() != current_models.keys():
+        return StoreChange(seq=seq, store_id=current["id"], snapshot=build_store(current))
 
-_store_subscriptions = {}
+    changed_models = [
+        build_model(m) for name, m in current_models.items() if m != previous_models[name]
+    ]
+    change = StoreChange(seq=seq, store_id=current["id"], models=changed_models)
+    changed = bool(changed_models)
+    if current.get("active_user_count", 0) != previous.get("active_user_count", 0):
+        change.active_user_count = current.get("active_user_count", 0)
+        changed = True
+    if current.get("installed_widget_id") != previous.get("installed_widget_id"):
+        change.installed_widget_id = current.get("installed_widget_id")
+        changed = True
+    return change if changed else None
 
 
 @strawberry.type
 class Subscription:
     @strawberry.subscription
-    async def store_updated(self, store_id: str) -> AsyncGenerator[Store, None]:
+    async def store_updated(self, store_id: str, info) -> AsyncGenerator[Store, None]:
         db = mongo_module.db
         store_service.set_db(db)
-        
-        if store_id not in _store_subscriptions:
-            _store_subscriptions[store_id] = []
-        
-        sub_id = id(self)
-        _store_subscriptions[store_id].append(sub_id)
-        
+        projection = store_projection(info)
+
+        # Subscribe before the first read so no change in between is missed
+        subscriber = store_events.subscribe(store_id, _connection(info))
         try:
-            s = await store_service.get_store_by_id(store_id)
+            s = await store_service.get_store_by_id(store_id, projection)
             if s:
-                yield Store(
-                    id=s["id"],
-                    name=s["name"],
-                    description=s.get("description", ""),
-                    image_url=normalize_image_url(s.get("image_url", "")),
-                    models=[
-                        Model(
-                            name=m.get("name", ""),
-                            glb_url=normalize_model_url(m.get("glb_url", "")),
-                            position=m.get("position", [0, 0]),
-                            size=m.get("size", [1, 1, 1]),
-                            entrance_order=m.get("entrance_order", 0)
-                        )
-                        for m in s.get("models", [])
-                    ],
-                    active_user_count=s.get("active_user_count", 0),
-                    installed_widget_id=s.get("installed_widget_id"),
-                    installed_widget_domain=s.get("installed_widget_domain")
-                )
-            
+                yield build_store(s)
+
             while True:
-                await asyncio.sleep(1)
-                s = await store_service.get_store_by_id(store_id)
+                # Events that piled up while we were busy fold into one read
+                await subscriber.next_event()
+
+                s = await store_service.get_store_by_id(store_id, projection)
                 if s:
-                    yield Store(
-                        id=s["id"],
-                        name=s["name"],
-                        description=s.get("description", ""),
-                        image_url=normalize_image_url(s.get("image_url", "")),
-                        models=[
-                            Model(
-                                name=m.get("name", ""),
-                                glb_url=normalize_model_url(m.get("glb_url", "")),
-                                position=m.get("position", [0, 0]),
-                                size=m.get("size", [1, 1, 1]),
-                                entrance_order=m.get("entrance_order", 0)
-                            )
-                            for m in s.get("models", [])
-                        ],
-                        active_user_count=s.get("active_user_count", 0),
-                        installed_widget_id=s.get("installed_widget_id"),
-                        installed_widget_domain=s.get("installed_widget_domain")
-                    )
+                    reset_loaders(info)
+                    yield build_store(s)
         finally:
-            if store_id in _store_subscriptions:
-                _store_subscriptions[store_id] = [
-                    s for s in _store_subscriptions[store_id] if s != sub_id
+            store_events.unsubscribe(store_id, subscriber)
+
+    @strawberry.subscription
+    async def store_changes(self, store_id: str, info) -> AsyncGenerator[StoreChange, None]:
+        db = mongo_module.db
+        store_service.set_db(db)
+
+        subscriber = store_events.subscribe(store_id, _connection(info))
+        try:
+            previous = await store_service.get_store_by_id(store_id)
+            if not previous:
+                return
+            seq = 1
+            yield StoreChange(seq=seq, store_id=store_id, snapshot=build_store(previous))
+
+            while True:
+                await subscriber.next_event()
+
+                current = await store_service.get_store_by_id(store_id)
+                if not current:
+                    continue
+                change = _diff_store(seq + 1, previous, current)
+                previous = current
+                if change is None:
+                    # Nothing visible changed, so nothing is sent
+                    continue
+                seq = change.seq
+                reset_loaders(info)
+                yield change
+        finally:
+            store_events.unsubscribe(store_id, subscriber)
+
+    @strawberry.subscription
+    async def lobby_occupancy(self) -> AsyncGenerator[List[StoreOccupancy], None]:
+        """Every store's count on subscribe, then only the stores whose count changed."""
+        lobby_occupancy.set_db(mongo_module.db)
+        viewer = await lobby_occupancy.join()
+        try:
+            while True:
+                changes = await viewer.next_changes()
+                yield [
+                    StoreOccupancy(store_id=store_id, count=count)
+                    for store_id, count in changes.items()
                 ]
+        finally:
+            lobby_occupancy.leave(viewer)
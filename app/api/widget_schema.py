@@ -4,6 +4,13 @@ from datetime import datetime
 import db.mongo as mongo_module
 from services.widget_service import widget_service
 import traceback
+from utils.projection import selected_paths, build_projection
+from api.loaders import get_loaders
+from api.response_cache import CacheControl
+from api.query_cost import Cost
+
+# Cache hint, in seconds, for widget config served to embeds
+WIDGET_MAX_AGE = 60
 
 @strawberry.type
 class WidgetConfigType:
@@ -17,6 +24,23 @@ class WidgetConfigType:
     updated_at: datetime = strawberry.field(name="updatedAt")
 
 
+def build_widget(w: dict) -> WidgetConfigType:
+    return WidgetConfigType(
+        id=str(w["_id"]),
+        store_id=str(w.get("store_id", "")),
+        domain=w.get("domain", ""),
+        video_url=w.get("video_url", ""),
+        banner_text=w.get("banner_text", ""),
+        is_active=w.get("is_active", False),
+        created_at=w.get("created_at"),
+        updated_at=w.get("updated_at"),
+    )
+
+
+def widget_projection(info) -> dict:
+    return build_projection(selected_paths(info), {"id": None})
+
+
 @strawberry.type
 class AnalyticsEventType:
     id: str
@@ -37,47 +61,23 @@ class AnalyticsSummaryType:
 
 @strawberry.type
 class WidgetQuery:
-    @strawberry.field
-    async def get_widget_by_id(self, widget_id: str) -> Optional[WidgetConfigType]:
-        db = mongo_module.db
-        widget_service.set_db(db)
-        
-        widget = await widget_service.get_widget_by_id(widget_id)
+    @strawberry.field(directives=[CacheControl(max_age=WIDGET_MAX_AGE)])
+    async def get_widget_by_id(self, widget_id: str, info) -> Optional[WidgetConfigType]:
+        widget = await get_loaders(info).widget_by_id.load(widget_id)
         
         if not widget:
             return None
         
-        return WidgetConfigType(
-            id=str(widget["_id"]),
-            store_id=str(widget["store_id"]),
-            domain=widget["domain"],
-            video_url=widget["video_url"],
-            banner_text=widget.get("banner_text", ""),
-            is_active=widget["is_active"],
-            created_at=widget["created_at"],
-            updated_at=widget["updated_at"],
-        )
+        return build_widget(widget)
     
-    @strawberry.field
-    async def get_widget_by_domain(self, domain: str) -> Optional[WidgetConfigType]:
-        db = mongo_module.db
-        widget_service.set_db(db)
-        
-        widget = await widget_service.get_widget_by_domain(domain)
+    @strawberry.field(directives=[CacheControl(max_age=WIDGET_MAX_AGE)])
+    async def get_widget_by_domain(self, domain: str, info) -> Optional[WidgetConfigType]:
+        widget = await get_loaders(info).widget_by_domain.load(domain)
         
         if not widget:
             return None
         
-        return WidgetConfigType(
-            id=str(widget["_id"]),
-            store_id=str(widget["store_id"]),
-            domain=widget["domain"],
-            video_url=widget["video_url"],
-            banner_text=widget.get("banner_text", ""),
-            is_active=widget["is_active"],
-            created_at=widget["created_at"],
-            updated_at=widget["updated_at"],
-        )
+        return build_widget(widget)
     
     @strawberry.field
     async def get_widgets_by_store(
@@ -88,44 +88,20 @@ class WidgetQuery:
         db = mongo_module.db
         widget_service.set_db(db)
         
-        widgets = await widget_service.get_widgets_by_store(store_id)
+        widgets = await widget_service.get_widgets_by_store(store_id, widget_projection(info))
         
-        return [
-            WidgetConfigType(
-                id=str(w["_id"]),
-                store_id=str(w["store_id"]),
-                domain=w["domain"],
-                video_url=w["video_url"],
-                banner_text=w.get("banner_text", ""),
-                is_active=w["is_active"],
-                created_at=w["created_at"],
-                updated_at=w["updated_at"],
-            )
-            for w in widgets
-        ]
+        return [build_widget(w) for w in widgets]
     
-    @strawberry.field
+    @strawberry.field(directives=[Cost(weight=5)])
     async def get_all_widgets(self, info=None) -> List[WidgetConfigType]:
         db = mongo_module.db
         widget_service.set_db(db)
         
-        widgets = await widget_service.get_all_widgets()
+        widgets = await widget_service.get_all_widgets(widget_projection(info))
         
-        return [
-            WidgetConfigType(
-                id=str(w["_id"]),
-                store_id=str(w["store_id"]),
-                domain=w["domain"],
-                video_url=w["video_url"],
-                banner_text=w.get("banner_text", ""),
-                is_active=w["is_active"],
-                created_at=w["created_at"],
-                updated_at=w["updated_at"],
-            )
-            for w in widgets
-        ]
+        return [build_widget(w) for w in widgets]
     
-    @strawberry.field
+    @strawberry.field(directives=[Cost(weight=10)])
     async def get_analytics_summary(
         self,
         store_id: str = strawberry.argument(name="storeId"),
@@ -142,7 +118,7 @@ class WidgetQuery:
             link_clicked=summary.get("link_clicked", 0),
         )
     
-    @strawberry.field
+    @strawberry.field(directives=[Cost(weight=10)])
     async def get_analytics_by_domain(
         self,
         domain: str,
@@ -202,18 +178,9 @@ class WidgetMutation:
             banner_text=banner_text
         )
         
-        widget = await widget_service.get_widget_by_id(widget_id)
+        widget = await widget_service.get_widget_by_id(widget_id, widget_projection(info))
         
-        return WidgetConfigType(
-            id=str(widget["_id"]),
-            store_id=str(widget["store_id"]),
-            domain=widget["domain"],
-            video_url=widget["video_url"],
-            banner_text=widget.get("banner_text", ""),
-            is_active=widget["is_active"],
-            created_at=widget["created_at"],
-            updated_at=widget["updated_at"],
-        )
+        return build_widget(widget)
     
     @strawberry.mutation
     async def update_widget(
@@ -239,18 +206,9 @@ class WidgetMutation:
         if not success:
             return None
         
-        widget = await widget_service.get_widget_by_id(widget_id)
+        widget = await widget_service.get_widget_by_id(widget_id, widget_projection(info))
         
-        return WidgetConfigType(
-            id=str(widget["_id"]),
-            store_id=str(widget["store_id"]),
-            domain=widget["domain"],
-            video_url=widget["video_url"],
-            banner_text=widget.get("banner_text", ""),
-            is_active=widget["is_active"],
-            created_at=widget["created_at"],
-            updated_at=widget["updated_at"],
-        )
+        return build_widget(widget)
     
     @strawberry.mutation
     async def delete_widget(
@@ -278,14 +236,14 @@ class WidgetMutation:
         
         
         try:
-            result = await widget_service.track_event(
+            await widget_service.track_event(
                 store_id=store_id,
                 domain=domain,
                 event_type=event_type,
                 user_agent=user_agent,
                 ip_address=ip_address
             )
-            return result
+            return True
         except Exception as e:
             traceback.print_exc()
             return False
@@ -6,9 +6,47 @@ load_dotenv()
 class Settings:
     MONGO_URI: str = os.getenv("MONGO_URI")
     DB_NAME: str = os.getenv("DB_NAME")
+    MONGO_MIN_POOL_SIZE: int = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+    MONGO_MAX_POOL_SIZE: int = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+    MONGO_MAX_IDLE_TIME_MS: int = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "0"))
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: int = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "0"))
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "30000"))
+    MONGO_CONNECT_TIMEOUT_MS: int = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "20000"))
+    MONGO_SOCKET_TIMEOUT_MS: int = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "0"))
+    # Comma separated, in order of preference: zstd, snappy, zlib
+    MONGO_COMPRESSORS: str = os.getenv("MONGO_COMPRESSORS", "")
+    MONGO_READ_PREFERENCE: str = os.getenv("MONGO_READ_PREFERENCE", "primary")
     SECRET_KEY: str = os.getenv("SECRET_KEY", "secret")
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_HOURS: int = 24
     BACKEND_URL: str = os.getenv("BACKEND_URL", "http://localhost:8000")
+    SESSION_TIMEOUT_MINUTES: int = int(os.getenv("SESSION_TIMEOUT_MINUTES", "5"))
+    SESSION_SWEEP_INTERVAL_SECONDS: int = int(os.getenv("SESSION_SWEEP_INTERVAL_SECONDS", "30"))
+    HEARTBEAT_FLUSH_INTERVAL_SECONDS: float = float(os.getenv("HEARTBEAT_FLUSH_INTERVAL_SECONDS", "2"))
+    CATALOG_CACHE_MAX_ENTRIES: int = int(os.getenv("CATALOG_CACHE_MAX_ENTRIES", "1000"))
+    CATALOG_CACHE_TTL_SECONDS: float = float(os.getenv("CATALOG_CACHE_TTL_SECONDS", "300"))
+    STORE_POLL_INTERVAL_SECONDS: float = float(os.getenv("STORE_POLL_INTERVAL_SECONDS", "1"))
+    CHANGE_STREAM_TOKEN_SAVE_SECONDS: float = float(os.getenv("CHANGE_STREAM_TOKEN_SAVE_SECONDS", "1"))
+    SUBSCRIPTION_QUEUE_SIZE: int = int(os.getenv("SUBSCRIPTION_QUEUE_SIZE", "1"))
+    SUBSCRIPTION_SLOW_CONSUMER_SECONDS: float = float(os.getenv("SUBSCRIPTION_SLOW_CONSUMER_SECONDS", "30"))
+    DRAG_BROADCAST_HZ: float = float(os.getenv("DRAG_BROADCAST_HZ", "30"))
+    DRAG_CHECKPOINT_SECONDS: float = float(os.getenv("DRAG_CHECKPOINT_SECONDS", "2"))
+    LOBBY_TICK_SECONDS: float = float(os.getenv("LOBBY_TICK_SECONDS", "1"))
+    BROADCAST_BACKEND: str = os.getenv("BROADCAST_BACKEND", "memory")
+    BROADCAST_CAPPED_SIZE_BYTES: int = int(os.getenv("BROADCAST_CAPPED_SIZE_BYTES", str(16 * 1024 * 1024)))
+    BROADCAST_RETRY_SECONDS: float = float(os.getenv("BROADCAST_RETRY_SECONDS", "0.5"))
+    PERSISTED_QUERIES_MAX_ENTRIES: int = int(os.getenv("PERSISTED_QUERIES_MAX_ENTRIES", "1000"))
+    PERSISTED_QUERIES_FILE: str = os.getenv("PERSISTED_QUERIES_FILE", "")
+    PERSISTED_QUERIES_ALLOWLIST_ONLY: bool = os.getenv("PERSISTED_QUERIES_ALLOWLIST_ONLY", "false").lower() == "true"
+    RESPONSE_CACHE_MAX_ENTRIES: int = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+    QUERY_MAX_COST: int = int(os.getenv("QUERY_MAX_COST", "1000"))
+    QUERY_MAX_DEPTH: int = int(os.getenv("QUERY_MAX_DEPTH", "8"))
+    QUERY_COST_DEFAULT_LIST_SIZE: int = int(os.getenv("QUERY_COST_DEFAULT_LIST_SIZE", "20"))
+    GRAPHQL_MAX_BATCH_SIZE: int = int(os.getenv("GRAPHQL_MAX_BATCH_SIZE", "10"))
+    SLOW_QUERY_THRESHOLD_MS: float = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "100"))
+    SLOW_QUERY_TOP_N: int = int(os.getenv("SLOW_QUERY_TOP_N", "20"))
+    ADMIN_ENDPOINTS_ENABLED: bool = os.getenv("ADMIN_ENDPOINTS_ENABLED", "false").lower() == "true"
+    ENSURE_INDEXES_ON_STARTUP: bool = os.getenv("ENSURE_INDEXES_ON_STARTUP", "true").lower() == "true"
+    STORE_MAX_USERS: int = int(os.getenv("STORE_MAX_USERS", "2"))
 
 settings = Settings()
@@ -0,0 +1,158 @@
+from typing import Any, Dict, List
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from core.config import settings
+
+# Every index the app relies on, including the ones the migrations created,
+# so anything else found on a managed collection is reported as unmanaged
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        IndexModel("username", unique=True),
+        IndexModel("created_at"),
+    ],
+    "access_tokens": [
+        # Refreshing an expired JWT looks the token up by value
+        IndexModel("token"),
+    ],
+    "stores": [
+        IndexModel("name"),
+        IndexModel("created_at"),
+        # Polling fallback of the store watcher when change streams are unavailable
+        IndexModel("updated_at"),
+    ],
+    "store_sessions": [
+        IndexModel([("store_id", ASCENDING), ("user_id", ASCENDING)], unique=True),
+        IndexModel("session_id", unique=True),
+        IndexModel("last_heartbeat", expireAfterSeconds=settings.SESSION_TIMEOUT_MINUTES * 60),
+        # Occupancy recount: live sessions of one store
+        IndexModel([("store_id", ASCENDING), ("last_heartbeat", ASCENDING)]),
+    ],
+    "widget_configs": [
+        IndexModel([("store_id", ASCENDING), ("domain", ASCENDING)], unique=True),
+        IndexModel("is_active"),
+        IndexModel("store_id"),
+        # Widget lookup by domain, one at a time or batched with $in
+        IndexModel([("domain", ASCENDING), ("is_active", ASCENDING)]),
+    ],
+    "widget_analytics": [
+        IndexModel([("store_id", DESCENDING), ("timestamp", DESCENDING)]),
+        IndexModel([("domain", DESCENDING), ("timestamp", DESCENDING)]),
+        IndexModel("event_type"),
+    ],
+}
+
+# Options that change what an index does; anything else is build detail
+_COMPARED_OPTIONS = ("unique", "sparse", "expireAfterSeconds", "partialFilterExpression")
+
+
+def _options(index: Dict[str, Any]) -> Dict[str, Any]:
+    return {option: index[option] for option in _COMPARED_OPTIONS if option in index}
+
+
+async def diff_indexes(db) -> Dict[str, List[Dict[str, Any]]]:
+    """Compare the registry with the indexes on the server.
+
+    Returns missing indexes, indexes whose key or options differ from the
+    registry and indexes the registry does not know about.
+    """
+    report = {"missing": [], "changed": [], "unmanaged": []}
+    existing_collections = set(await db.list_collection_names())
+
+    for collection, models in INDEXES.items():
+        existing = {}
+        if collection in existing_collections:
+            existing = await db[collection].index_information()
+        by_key = {tuple(info["key"]): name for name, info in existing.items()}
+        matched = {"_id_"}
+
+        for model in models:
+            wanted = model.document
+            key = tuple(wanted["key"].items())
+            name = by_key.get(key, wanted["name"])
+            entry = {"collection": collection, "name": name, "model": model}
+            current = existing.get(name)
+            if current is None:
+                report["missing"].append(entry)
+                continue
+            matched.add(name)
+            if tuple(current["key"]) != key or _options(current) != _options(wanted):
+                report["changed"].append({
+                    **entry,
+                    "expected": {"key": list(key), **_options(wanted)},
+                    "actual": {"key": list(current["key"]), **_options(current)},
+                })
+
+        for name, info in existing.items():
+            if name not in matched:
+                report["unmanaged"].append({
+                    "collection": collection,
+                    "name": name,
+                    "actual": {"key": list(info["key"]), **_options(info)},
+                })
+    return report
+
+
+def _is_ttl_only_change(entry: Dict[str, Any]) -> bool:
+    expected = dict(entry["expected"])
+    actual = dict(entry["actual"])
+    expected.pop("expireAfterSeconds", None)
+    actual.pop("expireAfterSeconds", None)
+    return expected == actual and "expireAfterSeconds" in entry["actual"]
+
+
+async def apply_indexes(db, report: Dict[str, List[Dict[str, Any]]]) -> int:
+    """Create missing indexes and retune TTLs; returns how many were changed.
+
+    Other drift, such as a lost unique constraint, is only reported: fixing it
+    means dropping an index the running app may depend on.
+    """
+    applied = 0
+    for entry in report["missing"]:
+        try:
+            await db[entry["collection"]].create_indexes([entry["model"]])
+            print(f"✓ Created index {entry['collection']}.{entry['name']}")
+            applied += 1
+        except Exception as e:
+            print(f"✗ Failed to create index {entry['collection']}.{entry['name']}: {e}")
+
+    for entry in report["changed"]:
+        if not _is_ttl_only_change(entry):
+            continue
+        try:
+            await db.command(
+                "collMod", entry["collection"],
+                index={
+                    "name": entry["name"],
+                    "expireAfterSeconds": entry["expected"]["expireAfterSeconds"],
+                }
+            )
+            print(f"✓ Updated TTL of index {entry['collection']}.{entry['name']}")
+            applied += 1
+        except Exception as e:
+            print(f"✗ Failed to update index {entry['collection']}.{entry['name']}: {e}")
+    return applied
+
+
+def print_drift(report: Dict[str, List[Dict[str, Any]]]):
+    for entry in report["changed"]:
+        print(
+            f"✗ Index drift {entry['collection']}.{entry['name']}: "
+            f"expected {entry['expected']}, found {entry['actual']}"
+        )
+    for entry in report["unmanaged"]:
+        print(f"✗ Unmanaged index {entry['collection']}.{entry['name']}: {entry['actual']}")
+
+
+async def ensure_indexes(db) -> Dict[str, List[Dict[str, Any]]]:
+    """Create whatever the registry is missing and report the remaining drift.
+
+    Safe to run on every startup: when nothing is missing it only reads
+    index metadata.
+    """
+    report = await diff_indexes(db)
+    applied = await apply_indexes(db, report)
+    if applied:
+        report = await diff_indexes(db)
+    print_drift(report)
+    if not report["missing"] and not report["changed"]:
+        print(f"✓ Indexes up to date ({sum(len(m) for m in INDEXES.values())} managed)")
+    return report
@@ -1,19 +1,57 @@
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from strawberry.fastapi import GraphQLRouter
 from db.mongo import connect_to_mongo, close_mongo_connection, db
+from db.indexes import ensure_indexes
 from api.schema import combined_schema
+from api.loaders import get_context
+from api.drag_socket import router as drag_router
+from api.persisted_queries import query_registry, load_allowlist
+from api.response_cache import response_cache, cache_graphql_get
+from services.session_sweeper import start_session_sweeper, stop_session_sweeper
+from services.heartbeat_buffer import heartbeat_buffer
+from services.catalog_cache import catalog_cache
+from services.store_watcher import store_watcher
+from services.store_events import store_events
+from services.broadcast import create_broadcast
+from services.drag_relay import drag_relay
+from services.lobby_occupancy import lobby_occupancy
+from services.metrics import registry as metrics_registry
+from services.slow_queries import slow_query_log
+from services.auth import auth_service
+from core.config import settings
+import db.mongo as mongo_module
 import os 
 
 # Lifespan context manager for startup/shutdown
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
+    if settings.PERSISTED_QUERIES_FILE:
+        count = load_allowlist(settings.PERSISTED_QUERIES_FILE)
+        print(f"✓ Registered {count} persisted queries")
     await connect_to_mongo()
+    if settings.ENSURE_INDEXES_ON_STARTUP:
+        await ensure_indexes(mongo_module.db)
+    sweeper_task = start_session_sweeper()
+    heartbeat_buffer.set_db(mongo_module.db)
+    heartbeat_buffer.start()
+    await store_events.connect(create_broadcast(settings.BROADCAST_BACKEND, mongo_module.db))
+    store_watcher.set_db(mongo_module.db)
+    store_watcher.start()
+    drag_relay.set_db(mongo_module.db)
+    drag_relay.start()
     yield
     # Shutdown
+    await lobby_occupancy.stop()
+    await drag_relay.stop()
+    await store_watcher.stop()
+    await store_events.disconnect()
+    await heartbeat_buffer.stop()
+    await stop_session_sweeper(sweeper_task)
     await close_mongo_connection()
 
 
@@ -24,6 +62,9 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Registered before CORS so the CORS middleware also wraps cached responses
+app.middleware("http")(cache_graphql_get)
+
 # CORS middleware - specific origins for credentials
 app.add_middleware(
     CORSMiddleware,
@@ -33,7 +74,8 @@ app.add_middleware(
     allow_headers=["*", "Authorization"]
 )
 
-app.include_router(GraphQLRouter(combined_schema), prefix="/graphql")
+app.include_router(GraphQLRouter(combined_schema, context_getter=get_context), prefix="/graphql")
+app.include_router(drag_router)
 
 # Serve static files (media folder)
 media_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "media")
@@ -54,6 +96,54 @@ async def root():
     }
 
 
+@app.get("/stats")
+async def stats():
+    """In-process cache and runtime counters"""
+    return {
+        "catalog_cache": catalog_cache.stats(),
+        "subscriptions": store_events.stats(),
+        "persisted_queries": query_registry.stats(),
+        "response_cache": response_cache.stats()
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus scrape endpoint"""
+    store_events.export_metrics()
+    return PlainTextResponse(
+        metrics_registry.render(), media_type="text/plain; version=0.0.4"
+    )
+
+
+async def require_admin_access(request: Request):
+    """Admin routes are off unless enabled, and then need a valid bearer token"""
+    if not settings.ADMIN_ENDPOINTS_ENABLED:
+        raise HTTPException(404, "Not Found")
+
+    auth_header = request.headers.get("Authorization")
+    if not auth_header or not auth_header.startswith("Bearer "):
+        raise HTTPException(401, "Authorization token missing")
+    if not await auth_service.verify_token(auth_header.split(" ")[1]):
+        raise HTTPException(401, "Access token invalid or expired")
+
+
+@app.get("/admin/slow-queries", dependencies=[Depends(require_admin_access)])
+async def slow_queries():
+    """Slowest MongoDB query shapes and the GraphQL operations behind them"""
+    return {
+        "threshold_ms": slow_query_log.threshold_ms,
+        "shapes": slow_query_log.top()
+    }
+
+
+@app.delete("/admin/slow-queries", dependencies=[Depends(require_admin_access)])
+async def reset_slow_queries():
+    """Start a new slow-query window"""
+    slow_query_log.reset()
+    return {"success": True}
+
+
 @app.get("/widget/index.js")
 async def get_widget():
     """Serve widget JS file for embedding on external domains"""
@@ -4,6 +4,7 @@ from fastapi import HTTPException
 from functools import wraps
 import inspect
 import db.mongo as mongo_module
+from api.loaders import get_loaders
 
 def authmanager(resolver):
     @wraps(resolver)
@@ -24,7 +25,9 @@ def authmanager(resolver):
 
         # Get MongoDB db instance
         db = mongo_module.db
-        user, new_access_token = await validate_or_refresh_access_token(access_token, db)
+        user, new_access_token = await validate_or_refresh_access_token(
+            access_token, db, user_loader=get_loaders(info).user_by_id
+        )
 
         # Add user info to context
         info.context["user"] = user
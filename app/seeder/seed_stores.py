@@ -16,24 +16,26 @@ stores_data = [
                 "glb_url": "/media/models/laptop.glb",
                 "position": [50, 120],
                 "size": [0.5, 0.5, 0.5],
-                "entrance_order": 1
+                "entrance_order": 1,
+                "version": 0
             },
             {
                 "name": "Mouse",
                 "glb_url": "../media/models/mouse.glb",
                 "position": [200, 180],
                 "size": [0.3, 0.3, 0.3],
-                "entrance_order": 2
+                "entrance_order": 2,
+                "version": 0
             },
             {
                 "name": "Keyboard",
                 "glb_url": "../media/models/keyboard.glb",
                 "position": [350, 150],
                 "size": [0.4, 0.4, 0.4],
-                "entrance_order": 3
+                "entrance_order": 3,
+                "version": 0
             }
         ],
-        "active_sessions": [],
         "active_user_count": 0,
         "created_at": datetime.utcnow(),
         "updated_at": datetime.utcnow()
@@ -48,24 +50,26 @@ stores_data = [
                 "glb_url": "../media/models/smartphone.glb",
                 "position": [60, 100],
                 "size": [0.4, 0.4, 0.4],
-                "entrance_order": 1
+                "entrance_order": 1,
+                "version": 0
             },
             {
                 "name": "Headphones",
                 "glb_url": "../media/models/headphones.glb",
                 "position": [220, 140],
                 "size": [0.3, 0.3, 0.3],
-                "entrance_order": 2
+                "entrance_order": 2,
+                "version": 0
             },
             {
                 "name": "Camera",
                 "glb_url": "../media/models/camera.glb",
                 "position": [320, 180],
                 "size": [0.5, 0.5, 0.5],
-                "entrance_order": 3
+                "entrance_order": 3,
+                "version": 0
             }
         ],
-        "active_sessions": [],
         "active_user_count": 0,
         "created_at": datetime.utcnow(),
         "updated_at": datetime.utcnow()
@@ -8,14 +8,17 @@ import jwt
 
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
-async def validate_or_refresh_access_token(access_token: str, db):
+async def validate_or_refresh_access_token(access_token: str, db, user_loader=None):
 
     new_access_token = None
 
     payload = await auth_service.verify_token(access_token)
     if payload:
         user_id = payload.get("user_id")
-        user = await db.users.find_one({"_id": ObjectId(user_id)})
+        if user_loader is not None:
+            user = await user_loader.load(user_id)
+        else:
+            user = await db.users.find_one({"_id": ObjectId(user_id)})
         if not user:
             raise HTTPException(401, "User not found")
         return user, new_access_token
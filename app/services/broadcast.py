@@ -0,0 +1,171 @@
+import asyncio
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid
+from core.config import settings
+
+MessageHandler = Callable[[str, Dict[str, Any]], None]
+HISTORY_LOST_MESSAGE = "✗ Broadcast history overwritten while the tail was down, some messages were lost"
+
+
+class BroadcastBackend(ABC):
+    """Fans channel messages out to every other app process.
+
+    Messages published by a node are not delivered back to that node; the
+    caller has already handled them locally.
+    """
+
+    def __init__(self):
+        self.node_id = str(uuid.uuid4())
+        self._on_message: Optional[MessageHandler] = None
+
+    async def connect(self, on_message: MessageHandler):
+        self._on_message = on_message
+
+    async def disconnect(self):
+        self._on_message = None
+
+    @abstractmethod
+    def publish(self, channel: str, message: Dict[str, Any]):
+        """Send a message to every other node; must not block the caller."""
+
+
+class MemoryBroadcast(BroadcastBackend):
+    """Single-process backend; nodes sharing one instance can stand in for a cluster in tests."""
+
+    def __init__(self, bus: Optional[List["MemoryBroadcast"]] = None):
+        super().__init__()
+        self._bus = bus if bus is not None else [self]
+
+    def peer(self) -> "MemoryBroadcast":
+        """Another node on the same in-memory bus."""
+        return MemoryBroadcast(self._bus)
+
+    async def connect(self, on_message: MessageHandler):
+        await super().connect(on_message)
+        if self not in self._bus:
+            self._bus.append(self)
+
+    async def disconnect(self):
+        await super().disconnect()
+        if self in self._bus:
+            self._bus.remove(self)
+
+    def publish(self, channel: str, message: Dict[str, Any]):
+        for node in self._bus:
+            if node is not self and node._on_message is not None:
+                node._on_message(channel, message)
+
+
+class MongoBroadcast(BroadcastBackend):
+    """Networked backend over a capped collection read with a tailable cursor."""
+
+    def __init__(self, db, collection: str = "broadcast_events"):
+        super().__init__()
+        self.db = db
+        self.collection_name = collection
+        self._task: Optional[asyncio.Task] = None
+        self._pending: set = set()
+
+    async def _ensure_collection(self):
+        try:
+            await self.db.create_collection(
+                self.collection_name,
+                capped=True,
+                size=settings.BROADCAST_CAPPED_SIZE_BYTES
+            )
+        except CollectionInvalid:
+            pass
+
+        collection = self.db[self.collection_name]
+        # A tailable cursor on an empty capped collection dies immediately
+        if await collection.estimated_document_count() == 0:
+            await collection.insert_one({"channel": None, "created_at": datetime.utcnow()})
+
+    async def _newest_id(self, collection):
+        last = await collection.find_one({}, {"_id": 1}, sort=[("$natural", -1)])
+        return last["_id"] if last else None
+
+    async def _tail(self):
+        """Follow the collection in insertion order.
+
+        _ids are generated by each publishing client, so they do not follow
+        insertion order across nodes. After a restart the cursor therefore
+        reads from the start in $natural order and skips up to the last
+        message it delivered.
+        """
+        collection = self.db[self.collection_name]
+        last_id = await self._newest_id(collection)
+
+        while True:
+            skipping = last_id is not None
+            if skipping and not await collection.find_one({"_id": last_id}, {"_id": 1}):
+                print(HISTORY_LOST_MESSAGE)
+                last_id = await self._newest_id(collection)
+                skipping = last_id is not None
+
+            cursor = collection.find({}, cursor_type=CursorType.TAILABLE_AWAIT)
+            try:
+                while cursor.alive:
+                    async for doc in cursor:
+                        if skipping:
+                            skipping = doc["_id"] != last_id
+                            continue
+                        last_id = doc["_id"]
+                        if doc.get("channel") is None or doc.get("origin") == self.node_id:
+                            continue
+                        if self._on_message is not None:
+                            self._on_message(doc["channel"], doc["message"])
+                    if skipping:
+                        # The last delivered message was overwritten during the scan
+                        print(HISTORY_LOST_MESSAGE)
+                        skipping = False
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"✗ Broadcast tail failed: {e}")
+            await asyncio.sleep(settings.BROADCAST_RETRY_SECONDS)
+
+    async def connect(self, on_message: MessageHandler):
+        await super().connect(on_message)
+        await self._ensure_collection()
+        self._task = asyncio.create_task(self._tail())
+
+    async def disconnect(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+        await super().disconnect()
+
+    async def _insert(self, channel: str, message: Dict[str, Any]):
+        try:
+            await self.db[self.collection_name].insert_one({
+                "channel": channel,
+                "message": message,
+                "origin": self.node_id,
+                "created_at": datetime.utcnow()
+            })
+        except Exception as e:
+            print(f"✗ Broadcast publish failed: {e}")
+
+    def publish(self, channel: str, message: Dict[str, Any]):
+        task = asyncio.create_task(self._insert(channel, message))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+
+def create_broadcast(name: str, db=None) -> BroadcastBackend:
+    if name == "memory":
+        return MemoryBroadcast()
+    if name == "mongo":
+        return MongoBroadcast(db)
+    raise ValueError(f"Unknown broadcast backend: {name}")
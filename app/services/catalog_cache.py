@@ -0,0 +1,80 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from core.config import settings
+
+# Store fields that only change through seeding or widget installation
+STATIC_STORE_FIELDS = ("name", "description", "image_url", "installed_widget_id")
+STATIC_MODEL_FIELDS = ("glb_url", "size", "entrance_order")
+
+
+def static_part(store: Dict[str, Any]) -> Dict[str, Any]:
+    entry = {field: store[field] for field in STATIC_STORE_FIELDS if field in store}
+    entry["_id"] = store["_id"]
+    entry["models"] = [
+        {"name": m.get("name"), **{f: m[f] for f in STATIC_MODEL_FIELDS if f in m}}
+        for m in store.get("models", [])
+    ]
+    return entry
+
+
+class CatalogCache:
+    """In-memory LRU cache with TTL for the static part of store documents."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, store_id: str) -> Optional[Dict[str, Any]]:
+        item = self._entries.get(store_id)
+        if item is None or item[0] < time.monotonic():
+            if item is not None:
+                del self._entries[store_id]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(store_id)
+        self.hits += 1
+        entry = item[1]
+        # Callers decorate the result, so hand out copies
+        return {**entry, "models": [dict(m) for m in entry["models"]]}
+
+    def put(self, store_id: str, store: Dict[str, Any], generation: Optional[int] = None):
+        """Cache a store read from MongoDB.
+
+        Pass the value of `invalidations` taken before the read: if anything was
+        invalidated meanwhile, the document may predate that write and is skipped.
+        """
+        if generation is not None and generation != self.invalidations:
+            return
+        self._entries[store_id] = (time.monotonic() + self.ttl_seconds, static_part(store))
+        self._entries.move_to_end(store_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, store_id: Optional[str] = None):
+        if store_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(store_id, None)
+        self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+catalog_cache = CatalogCache(
+    max_entries=settings.CATALOG_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.CATALOG_CACHE_TTL_SECONDS
+)
@@ -0,0 +1,231 @@
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Set
+from fastapi import WebSocket
+from services.store import store_service
+from services.store_events import store_events
+from core.config import settings
+
+CHANNEL_PREFIX = "drag:"
+
+
+class DragMember:
+    """One websocket in a drag room with its outgoing, per-model coalesced moves."""
+
+    def __init__(self, websocket: WebSocket, user_id: str):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.outbox: Dict[str, Dict[str, Any]] = {}
+        self.sending = False
+
+
+class ActiveDrag:
+    """Latest position of a model being dragged that is not yet persisted."""
+
+    def __init__(self, user_id: str, position: List[float], expected_version: Optional[int]):
+        self.user_id = user_id
+        self.position = position
+        self.expected_version = expected_version
+        self.dirty = True
+        self.persisted_at = time.monotonic()
+        # Checkpoints and the drop must not race on expected_version
+        self.lock = asyncio.Lock()
+
+
+class DragRoom:
+    def __init__(self, store_id: str):
+        self.store_id = store_id
+        self.members: Set[DragMember] = set()
+        self.drags: Dict[str, ActiveDrag] = {}
+        # Moves made here that other app processes have not been sent yet
+        self.remote_outbox: Dict[str, Dict[str, Any]] = {}
+
+    def queue_move(self, move: Dict[str, Any], sender: Optional[DragMember] = None):
+        for member in self.members:
+            if member is not sender:
+                member.outbox[move["model"]] = move
+
+
+class DragRelay:
+    """Relays live model drags between the members of a store at a capped rate.
+
+    Moves are coalesced per model and sent at most DRAG_BROADCAST_HZ times a
+    second. Only drops and periodic checkpoints reach the database.
+    """
+
+    def __init__(self):
+        self.db = None
+        self._rooms: Dict[str, DragRoom] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    def set_db(self, db):
+        self.db = db
+
+    def join(self, store_id: str, websocket: WebSocket, user_id: str) -> DragMember:
+        room = self._rooms.get(store_id)
+        if room is None:
+            room = self._rooms[store_id] = DragRoom(store_id)
+        member = DragMember(websocket, user_id)
+        room.members.add(member)
+        return member
+
+    async def leave(self, store_id: str, member: DragMember):
+        room = self._rooms.get(store_id)
+        if room is None:
+            return
+        room.members.discard(member)
+        # Keep whatever the user was still dragging when the socket went away
+        for model_name, drag in list(room.drags.items()):
+            if drag.user_id == member.user_id:
+                await self._persist(room, model_name, drag)
+                if room.drags.get(model_name) is drag:
+                    del room.drags[model_name]
+        if not room.members and not room.drags:
+            del self._rooms[store_id]
+
+    def move(
+        self,
+        store_id: str,
+        member: DragMember,
+        model_name: str,
+        position: List[float],
+        expected_version: Optional[int] = None
+    ):
+        room = self._rooms[store_id]
+        drag = room.drags.get(model_name)
+        if drag is None or drag.user_id != member.user_id:
+            drag = room.drags[model_name] = ActiveDrag(member.user_id, position, expected_version)
+        else:
+            drag.position = position
+            drag.dirty = True
+
+        move = {"model": model_name, "position": position, "userId": member.user_id}
+        room.queue_move(move, sender=member)
+        room.remote_outbox[model_name] = move
+
+    async def drop(
+        self,
+        store_id: str,
+        member: DragMember,
+        model_name: str,
+        position: List[float],
+        expected_version: Optional[int] = None
+    ) -> tuple[bool, str, Optional[Dict[str, Any]]]:
+        self.move(store_id, member, model_name, position, expected_version)
+        room = self._rooms[store_id]
+        drag = room.drags.pop(model_name)
+        return await self._persist(room, model_name, drag)
+
+    async def _persist(
+        self, room: DragRoom, model_name: str, drag: ActiveDrag
+    ) -> tuple[bool, str, Optional[Dict[str, Any]]]:
+        async with drag.lock:
+            if not drag.dirty:
+                return True, "Position updated", None
+            drag.dirty = False
+            drag.persisted_at = time.monotonic()
+
+            store_service.set_db(self.db)
+            success, message, model = await store_service.update_model_position(
+                room.store_id, model_name, drag.position, drag.user_id, drag.expected_version
+            )
+            if success and drag.expected_version is not None:
+                # Our own write bumped the version; keep checking against it
+                drag.expected_version = model.get("version", drag.expected_version + 1)
+            return success, message, model
+
+    def _on_remote_message(self, channel: str, message: Dict[str, Any]):
+        room = self._rooms.get(channel[len(CHANNEL_PREFIX):])
+        if room is None:
+            return
+        for move in message["moves"]:
+            room.queue_move(move)
+
+    async def _send(self, member: DragMember, frame: Dict[str, Any]):
+        try:
+            await member.websocket.send_json(frame)
+        except Exception:
+            # The socket handler notices the disconnect and leaves the room
+            pass
+        finally:
+            member.sending = False
+
+    def _checkpoint(self, room: DragRoom, model_name: str, drag: ActiveDrag):
+        async def write():
+            try:
+                success, message, _ = await self._persist(room, model_name, drag)
+            except Exception as e:
+                print(f"✗ Drag checkpoint failed: {e}")
+                return
+            if not success and room.drags.get(model_name) is drag:
+                # Someone else moved it meanwhile; stop checkpointing this drag
+                del room.drags[model_name]
+                for member in room.members:
+                    if member.user_id == drag.user_id:
+                        member.outbox[model_name] = {
+                            "model": model_name, "error": message, "userId": drag.user_id
+                        }
+
+        self._track(asyncio.create_task(write()))
+
+    def _track(self, task: asyncio.Task):
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def tick(self):
+        now = time.monotonic()
+        for store_id, room in self._rooms.items():
+            for member in room.members:
+                # A member still busy with the last frame gets the newer state next tick
+                if member.outbox and not member.sending:
+                    frame = {"type": "drag", "moves": list(member.outbox.values())}
+                    member.outbox = {}
+                    member.sending = True
+                    self._track(asyncio.create_task(self._send(member, frame)))
+
+            if room.remote_outbox:
+                store_events.relay(
+                    f"{CHANNEL_PREFIX}{store_id}", {"moves": list(room.remote_outbox.values())}
+                )
+                room.remote_outbox = {}
+
+            for model_name, drag in room.drags.items():
+                if drag.dirty and now - drag.persisted_at >= settings.DRAG_CHECKPOINT_SECONDS:
+                    self._checkpoint(room, model_name, drag)
+
+    async def _tick_forever(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"✗ Drag relay tick failed: {e}")
+
+    def start(self):
+        store_events.add_channel(CHANNEL_PREFIX, self._on_remote_message)
+        self._task = asyncio.create_task(
+            self._tick_forever(1 / settings.DRAG_BROADCAST_HZ)
+        )
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        for room in list(self._rooms.values()):
+            for model_name, drag in list(room.drags.items()):
+                try:
+                    await self._persist(room, model_name, drag)
+                except Exception as e:
+                    print(f"✗ Drag drain failed: {e}")
+        self._rooms = {}
+
+
+drag_relay = DragRelay()
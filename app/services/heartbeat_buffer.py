@@ -0,0 +1,137 @@
+import asyncio
+from datetime import datetime, timedelta
+from bson.objectid import ObjectId
+from pymongo import UpdateOne
+from typing import Optional, Dict, List, Tuple
+from services.store import store_service
+from core.config import settings
+
+
+class HeartbeatBuffer:
+    """Write-behind buffer that coalesces session heartbeats.
+
+    Only the latest timestamp per (store_id, session_id) is kept and the whole
+    buffer is flushed as one unordered bulk_write on a short interval.
+    """
+
+    def __init__(self):
+        self.db = None
+        self._pending: Dict[Tuple[str, str], datetime] = {}
+        self._known: Dict[Tuple[str, str], datetime] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def set_db(self, db):
+        self.db = db
+
+    def track(self, store_id: str, session_id: str):
+        self._known[(store_id, session_id)] = datetime.utcnow()
+
+    def forget(self, store_id: str, session_id: str):
+        self._known.pop((store_id, session_id), None)
+        self._pending.pop((store_id, session_id), None)
+
+    def _is_known(self, key: Tuple[str, str], now: datetime) -> bool:
+        last_seen = self._known.get(key)
+        if last_seen is None:
+            return False
+        if now - last_seen > timedelta(minutes=settings.SESSION_TIMEOUT_MINUTES):
+            # The sweeper may already have expired it; confirm against the DB
+            del self._known[key]
+            return False
+        return True
+
+    def _prune_known(self, now: datetime) -> int:
+        """Drop sessions not heard from within the timeout, e.g. abandoned tabs."""
+        cutoff = now - timedelta(minutes=settings.SESSION_TIMEOUT_MINUTES)
+        stale = [key for key, last_seen in self._known.items() if last_seen < cutoff]
+        for key in stale:
+            del self._known[key]
+        return len(stale)
+
+    async def heartbeat(self, store_id: str, session_id: str) -> bool:
+        key = (store_id, session_id)
+        now = datetime.utcnow()
+
+        if self._is_known(key, now):
+            self._known[key] = now
+            self._pending[key] = now
+            return True
+
+        store_service.set_db(self.db)
+        if await store_service.heartbeat(store_id, session_id):
+            self._known[key] = now
+            return True
+        return False
+
+    async def flush(self) -> int:
+        if not self._pending:
+            return 0
+
+        pending, self._pending = self._pending, {}
+        operations = [
+            UpdateOne(
+                {"store_id": ObjectId(store_id), "session_id": session_id, "state": {"$exists": False}},
+                {"$set": {"last_heartbeat": last_heartbeat}}
+            )
+            for (store_id, session_id), last_heartbeat in pending.items()
+        ]
+        try:
+            result = await self.db.store_sessions.bulk_write(operations, ordered=False)
+        except Exception:
+            # Put the batch back unless a newer heartbeat arrived meanwhile
+            for key, last_heartbeat in pending.items():
+                if key not in self._pending:
+                    self._pending[key] = last_heartbeat
+            raise
+
+        if result.matched_count < len(operations):
+            await self._forget_ended(list(pending))
+        return len(operations)
+
+    async def _forget_ended(self, keys: List[Tuple[str, str]]):
+        """Drop sessions ended elsewhere so their next heartbeat returns False.
+
+        exitStore on another process, the TTL index or the sweeper may have
+        removed a session this process still answers for from memory.
+        """
+        live = await self.db.store_sessions.find(
+            {"session_id": {"$in": [session_id for _, session_id in keys]}, "state": {"$exists": False}},
+            {"store_id": 1, "session_id": 1}
+        ).to_list(length=None)
+        alive = {(str(doc["store_id"]), doc["session_id"]) for doc in live}
+        for key in keys:
+            if key not in alive:
+                self.forget(*key)
+
+    async def _flush_forever(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            self._prune_known(datetime.utcnow())
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"✗ Heartbeat flush failed: {e}")
+
+    def start(self):
+        self._task = asyncio.create_task(
+            self._flush_forever(settings.HEARTBEAT_FLUSH_INTERVAL_SECONDS)
+        )
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        try:
+            flushed = await self.flush()
+            if flushed:
+                print(f"✓ Drained {flushed} buffered heartbeat(s)")
+        except Exception as e:
+            print(f"✗ Heartbeat drain failed: {e}")
+
+
+heartbeat_buffer = HeartbeatBuffer()
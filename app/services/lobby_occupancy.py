@@ -0,0 +1,101 @@
+import asyncio
+from typing import Dict, Optional, Set
+from core.config import settings
+
+
+class LobbyViewer:
+    """Occupancy changes not yet sent to one viewer, latest count per store."""
+
+    def __init__(self, counts: Dict[str, int]):
+        self.pending: Dict[str, int] = dict(counts)
+        self._ready = asyncio.Event()
+        if self.pending:
+            self._ready.set()
+
+    def push(self, changes: Dict[str, int]):
+        self.pending.update(changes)
+        self._ready.set()
+
+    async def next_changes(self) -> Dict[str, int]:
+        await self._ready.wait()
+        self._ready.clear()
+        changes, self.pending = self.pending, {}
+        return changes
+
+
+class LobbyOccupancy:
+    """Shared producer of active_user_count for every store.
+
+    One read of all stores per tick, however many viewers are connected; each
+    viewer only receives the stores whose count changed. The producer runs only
+    while someone is watching.
+    """
+
+    def __init__(self):
+        self.db = None
+        self._counts: Dict[str, int] = {}
+        self._viewers: Set[LobbyViewer] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._starting = asyncio.Lock()
+
+    def set_db(self, db):
+        self.db = db
+
+    async def _read_counts(self) -> Dict[str, int]:
+        counts = {}
+        async for store in self.db.stores.find({}, {"active_user_count": 1}):
+            counts[str(store["_id"])] = store.get("active_user_count", 0)
+        return counts
+
+    async def tick(self):
+        counts = await self._read_counts()
+        changes = {
+            store_id: count for store_id, count in counts.items()
+            if self._counts.get(store_id) != count
+        }
+        # Removed stores are reported as empty once
+        for store_id in self._counts.keys() - counts.keys():
+            changes[store_id] = 0
+        self._counts = counts
+
+        if changes:
+            for viewer in self._viewers:
+                viewer.push(changes)
+
+    async def _tick_forever(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.tick()
+            except Exception as e:
+                print(f"✗ Lobby occupancy tick failed: {e}")
+
+    async def join(self) -> LobbyViewer:
+        async with self._starting:
+            if self._task is None:
+                self._counts = await self._read_counts()
+                self._task = asyncio.create_task(
+                    self._tick_forever(settings.LOBBY_TICK_SECONDS)
+                )
+        viewer = LobbyViewer(self._counts)
+        self._viewers.add(viewer)
+        return viewer
+
+    def leave(self, viewer: LobbyViewer):
+        self._viewers.discard(viewer)
+        if not self._viewers and self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def stop(self):
+        self._viewers.clear()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+lobby_occupancy = LobbyOccupancy()
@@ -0,0 +1,326 @@
+import threading
+from typing import Dict, List, Tuple
+from pymongo import monitoring
+
+# Seconds; spans a cached lookup up to a slow aggregation
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Label sets beyond this are folded into "other" to keep memory flat
+MAX_SERIES = 500
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        # Mongo command events arrive on Motor's worker threads
+        self._lock = threading.Lock()
+
+    def _key(self, series: dict, labels: Tuple[str, ...]) -> Tuple[str, ...]:
+        labels = tuple(str(label) for label in labels)
+        if labels not in series and len(series) >= MAX_SERIES:
+            return tuple("other" for _ in labels)
+        return labels
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            key = self._key(self._values, labels)
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for labels, value in self._values.items():
+                lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels: str):
+        with self._lock:
+            self._values[self._key(self._values, labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = buckets
+        # labels -> (per-bucket counts, sum, count)
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str):
+        with self._lock:
+            key = self._key(self._values, labels)
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for labels, (counts, total, count) in self._values.items():
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    le = _format_labels(self.labelnames, labels, f'le="{bound}"')
+                    lines.append(f"{self.name}_bucket{le} {cumulative}")
+                inf = _format_labels(self.labelnames, labels, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{inf} {count}")
+                plain = _format_labels(self.labelnames, labels)
+                lines.append(f"{self.name}_sum{plain} {total}")
+                lines.append(f"{self.name}_count{plain} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Process-wide metrics rendered in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        metric = Gauge(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(
+        self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()
+    ) -> Histogram:
+        metric = Histogram(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+graphql_operation_seconds = registry.histogram(
+    "graphql_operation_duration_seconds",
+    "Time to run a GraphQL operation",
+    ("operation", "type")
+)
+graphql_operation_errors = registry.counter(
+    "graphql_operation_errors_total",
+    "GraphQL operations that returned errors",
+    ("operation", "type")
+)
+graphql_field_seconds = registry.histogram(
+    "graphql_field_duration_seconds",
+    "Time spent in a GraphQL field resolver",
+    ("field",)
+)
+graphql_field_errors = registry.counter(
+    "graphql_field_errors_total",
+    "GraphQL field resolvers that raised",
+    ("field",)
+)
+mongo_command_seconds = registry.histogram(
+    "mongo_command_duration_seconds",
+    "Time for MongoDB to answer a command",
+    ("collection", "command")
+)
+mongo_command_failures = registry.counter(
+    "mongo_command_failures_total",
+    "MongoDB commands that failed",
+    ("collection", "command")
+)
+
+mongo_pool_connections = registry.gauge(
+    "mongo_pool_connections",
+    "Open connections in the MongoDB pool",
+    ("address",)
+)
+mongo_pool_in_use = registry.gauge(
+    "mongo_pool_connections_in_use",
+    "Connections checked out of the MongoDB pool",
+    ("address",)
+)
+mongo_pool_waiting = registry.gauge(
+    "mongo_pool_checkouts_waiting",
+    "Operations waiting to check out a MongoDB connection",
+    ("address",)
+)
+mongo_pool_checkout_seconds = registry.histogram(
+    "mongo_pool_checkout_wait_seconds",
+    "Time spent waiting for a MongoDB connection",
+    ("address",)
+)
+mongo_pool_checkout_failures = registry.counter(
+    "mongo_pool_checkout_failures_total",
+    "MongoDB connection checkouts that failed, e.g. on waitQueueTimeoutMS",
+    ("address", "reason")
+)
+
+subscription_subscribers = registry.gauge(
+    "graphql_subscription_subscribers",
+    "Store subscriptions with an event queue in this process"
+)
+subscription_queued_events = registry.gauge(
+    "graphql_subscription_queued_events",
+    "Events waiting in all store subscription queues"
+)
+subscription_max_queue_depth = registry.gauge(
+    "graphql_subscription_max_queue_depth",
+    "Deepest store subscription queue"
+)
+subscription_stalled = registry.gauge(
+    "graphql_subscription_stalled_subscribers",
+    "Dropped store subscriptions that have not ended yet"
+)
+subscription_dropped_events = registry.counter(
+    "graphql_subscription_dropped_events_total",
+    "Store events coalesced away because a subscription queue was full"
+)
+subscription_slow_disconnects = registry.counter(
+    "graphql_subscription_slow_disconnects_total",
+    "Store subscriptions dropped for falling behind"
+)
+# Report zero before the first drop rather than no sample at all
+subscription_dropped_events.inc(amount=0)
+subscription_slow_disconnects.inc(amount=0)
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Times every MongoDB command by collection and command name."""
+
+    def __init__(self):
+        self._collections: Dict[Tuple[object, int], str] = {}
+        self._lock = threading.Lock()
+
+    def _pop_collection(self, event) -> str:
+        with self._lock:
+            return self._collections.pop((event.connection_id, event.request_id), "")
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            collection = event.command.get("collection")
+        if not isinstance(collection, str):
+            # Database-level commands such as ping carry no collection
+            collection = ""
+        with self._lock:
+            self._collections[(event.connection_id, event.request_id)] = collection
+
+    def succeeded(self, event):
+        mongo_command_seconds.observe(
+            event.duration_micros / 1_000_000, self._pop_collection(event), event.command_name
+        )
+
+    def failed(self, event):
+        collection = self._pop_collection(event)
+        mongo_command_seconds.observe(
+            event.duration_micros / 1_000_000, collection, event.command_name
+        )
+        mongo_command_failures.inc(collection, event.command_name)
+
+
+mongo_command_metrics = MongoCommandMetrics()
+
+
+def _address(event) -> str:
+    host, port = event.address
+    return f"{host}:{port}"
+
+
+class MongoPoolMetrics(monitoring.ConnectionPoolListener):
+    """Pool size, checkouts in use or waiting, and checkout wait time per server."""
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        address = _address(event)
+        mongo_pool_connections.set(0, address)
+        mongo_pool_in_use.set(0, address)
+        mongo_pool_waiting.set(0, address)
+
+    def connection_created(self, event):
+        mongo_pool_connections.inc(_address(event))
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        mongo_pool_connections.dec(_address(event))
+
+    def connection_check_out_started(self, event):
+        mongo_pool_waiting.inc(_address(event))
+
+    def connection_check_out_failed(self, event):
+        address = _address(event)
+        mongo_pool_waiting.dec(address)
+        mongo_pool_checkout_failures.inc(address, str(event.reason))
+        if event.duration is not None:
+            mongo_pool_checkout_seconds.observe(event.duration, address)
+
+    def connection_checked_out(self, event):
+        address = _address(event)
+        mongo_pool_waiting.dec(address)
+        mongo_pool_in_use.inc(address)
+        if event.duration is not None:
+            mongo_pool_checkout_seconds.observe(event.duration, address)
+
+    def connection_checked_in(self, event):
+        mongo_pool_in_use.dec(_address(event))
+
+
+mongo_pool_metrics = MongoPoolMetrics()
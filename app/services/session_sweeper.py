@@ -0,0 +1,34 @@
+import asyncio
+from typing import Optional
+import db.mongo as mongo_module
+from services.store import store_service
+from services.slow_queries import current_operation
+from core.config import settings
+
+
+async def _sweep_forever(interval: int):
+    # Attribute the sweep's queries in the slow-query log
+    current_operation.set("session_sweeper")
+    while True:
+        try:
+            store_service.set_db(mongo_module.db)
+            expired = await store_service.sweep_stale_sessions()
+            if expired:
+                print(f"✓ Session sweeper expired stale sessions in {expired} store(s)")
+        except Exception as e:
+            print(f"✗ Session sweep failed: {e}")
+        await asyncio.sleep(interval)
+
+
+def start_session_sweeper() -> asyncio.Task:
+    return asyncio.create_task(_sweep_forever(settings.SESSION_SWEEP_INTERVAL_SECONDS))
+
+
+async def stop_session_sweeper(task: Optional[asyncio.Task]):
+    if task is None:
+        return
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
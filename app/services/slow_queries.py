@@ -0,0 +1,145 @@
+import json
+import threading
+from contextvars import ContextVar
+from typing import Any, Dict, List, Tuple
+from pymongo import monitoring
+from core.config import settings
+
+# Name of the GraphQL operation being served; Motor copies it onto its worker threads
+current_operation: ContextVar[str] = ContextVar("current_operation", default="")
+
+# Where each command keeps the filter that decides which documents it touches
+_FILTER_KEYS = {
+    "find": "filter",
+    "count": "query",
+    "distinct": "query",
+    "findAndModify": "query",
+    "aggregate": "pipeline",
+}
+
+
+def _shape(value: Any) -> Any:
+    """A query with its literal values replaced, so equal shapes group together.
+
+    Lists of documents, such as pipeline stages or $or clauses, keep every
+    element; value lists such as an $in collapse to ["?"] whatever their length.
+    """
+    if isinstance(value, dict):
+        return {key: _shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        if value and all(isinstance(item, dict) for item in value):
+            return [_shape(item) for item in value]
+        return ["?"] if value else []
+    return "?"
+
+
+def _command_query(command_name: str, command: Dict[str, Any]) -> Any:
+    if command_name in ("update", "delete"):
+        statements = command.get(command_name + "s") or [{}]
+        return statements[0].get("q", {})
+    return command.get(_FILTER_KEYS.get(command_name, ""), {})
+
+
+def query_shape(query: Any) -> str:
+    return json.dumps(_shape(query), sort_keys=True, default=str)
+
+
+def command_shape(command_name: str, command: Dict[str, Any]) -> str:
+    return query_shape(_command_query(command_name, command))
+
+
+class SlowQueryLog(monitoring.CommandListener):
+    """Logs MongoDB commands slower than SLOW_QUERY_THRESHOLD_MS and keeps the
+    slowest query shapes along with the GraphQL operation that ran them."""
+
+    def __init__(self, threshold_ms: float, top_n: int):
+        self.threshold_ms = threshold_ms
+        self.top_n = top_n
+        # Raw query per in-flight command; shaped only once it turns out slow
+        self._started: Dict[Tuple[object, int], Tuple[str, Any, str]] = {}
+        self._shapes: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            collection = event.command.get("collection")
+        if not isinstance(collection, str):
+            collection = ""
+        entry = (
+            collection,
+            _command_query(event.command_name, event.command),
+            current_operation.get() or "background",
+        )
+        with self._lock:
+            self._started[(event.connection_id, event.request_id)] = entry
+
+    def _finished(self, event):
+        with self._lock:
+            entry = self._started.pop((event.connection_id, event.request_id), None)
+        duration_ms = event.duration_micros / 1000
+        if entry is None or duration_ms < self.threshold_ms:
+            return
+
+        collection, query, operation = entry
+        shape = query_shape(query)
+        print(
+            f"✗ Slow query {duration_ms:.1f}ms {collection}.{event.command_name} "
+            f"operation={operation} shape={shape}"
+        )
+        self._record((collection, event.command_name, shape), operation, duration_ms)
+
+    def _record(self, key: Tuple[str, str, str], operation: str, duration_ms: float):
+        with self._lock:
+            stats = self._shapes.get(key)
+            if stats is None:
+                stats = self._shapes[key] = {
+                    "collection": key[0],
+                    "command": key[1],
+                    "shape": key[2],
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "operations": {},
+                }
+            stats["count"] += 1
+            stats["total_ms"] += duration_ms
+            stats["max_ms"] = max(stats["max_ms"], duration_ms)
+            stats["operations"][operation] = stats["operations"].get(operation, 0) + 1
+
+            # Rolling top-N: forget the cheapest shapes once there are too many
+            if len(self._shapes) > self.top_n * 2:
+                ranked = sorted(self._shapes, key=lambda k: self._shapes[k]["total_ms"])
+                for cheap in ranked[:len(self._shapes) - self.top_n]:
+                    del self._shapes[cheap]
+
+    def succeeded(self, event):
+        self._finished(event)
+
+    def failed(self, event):
+        self._finished(event)
+
+    def top(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            shapes = [
+                {
+                    **stats,
+                    "avg_ms": round(stats["total_ms"] / stats["count"], 2),
+                    "total_ms": round(stats["total_ms"], 2),
+                    "max_ms": round(stats["max_ms"], 2),
+                    "operations": dict(stats["operations"]),
+                }
+                for stats in self._shapes.values()
+            ]
+        shapes.sort(key=lambda s: s["total_ms"], reverse=True)
+        return shapes[:self.top_n]
+
+    def reset(self):
+        with self._lock:
+            self._shapes.clear()
+
+
+slow_query_log = SlowQueryLog(
+    threshold_ms=settings.SLOW_QUERY_THRESHOLD_MS,
+    top_n=settings.SLOW_QUERY_TOP_N
+)
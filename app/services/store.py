@@ -1,7 +1,52 @@
+import asyncio
 from datetime import datetime, timedelta
 from bson.objectid import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
 from typing import Optional, Dict, Any, List
 import uuid
+from core.config import settings
+from services.catalog_cache import catalog_cache, STATIC_STORE_FIELDS, STATIC_MODEL_FIELDS
+from services.store_events import store_events
+
+# A concurrent entry or exit for the same user holds the (store_id, user_id) key briefly
+ENTRY_ATTEMPTS = 5
+ENTRY_RETRY_SECONDS = 0.05
+
+
+def _session_cutoff() -> datetime:
+    return datetime.utcnow() - timedelta(minutes=settings.SESSION_TIMEOUT_MINUTES)
+
+
+def _live_projection(projection: Optional[Dict[str, int]]) -> Optional[Dict[str, int]]:
+    """Reduce a store projection to the fields the catalog cache cannot serve."""
+    if projection is None:
+        return {
+            **{field: 0 for field in STATIC_STORE_FIELDS},
+            **{f"models.{field}": 0 for field in STATIC_MODEL_FIELDS}
+        }
+
+    live = {}
+    for path in projection:
+        if path in STATIC_STORE_FIELDS or path == "_id":
+            continue
+        if path.startswith("models."):
+            if path[len("models."):] in STATIC_MODEL_FIELDS:
+                continue
+            live["models.name"] = 1
+        live[path] = 1
+    return live or None
+
+
+def _merge_live(cached: Dict[str, Any], live: Dict[str, Any]) -> Dict[str, Any]:
+    store = {**cached, **{k: v for k, v in live.items() if k != "models"}}
+    if "models" in live:
+        static_models = {m.get("name"): m for m in cached.get("models", [])}
+        store["models"] = [
+            {**static_models.get(m.get("name"), {}), **m} for m in live["models"]
+        ]
+    return store
+
 
 class StoreService:
     def __init__(self):
@@ -11,161 +56,321 @@ class StoreService:
         self.db = db
 
     
-    async def get_all_stores(self) -> List[Dict[str, Any]]:
-        stores = await self.db.stores.find({}).to_list(length=None)
+    async def get_all_stores(
+        self, projection: Optional[Dict[str, int]] = None
+    ) -> List[Dict[str, Any]]:
+        stores = await self.db.stores.find({}, projection).to_list(length=None)
         for store in stores:
             store["id"] = str(store["_id"])
-            await self._cleanup_stale_sessions(store["_id"])
         return stores
 
 
-    async def get_store_by_id(self, store_id: str) -> Optional[Dict[str, Any]]:
-        await self._cleanup_stale_sessions(ObjectId(store_id))
-        
-        store = await self.db.stores.find_one({"_id": ObjectId(store_id)})
-        if store:
+    async def list_store_summaries(
+        self, first: int, after: Optional[str] = None
+    ) -> tuple[List[Dict[str, Any]], bool]:
+        """Return one page of lobby cards ordered by _id, without models."""
+        query = {"_id": {"$gt": ObjectId(after)}} if after else {}
+        stores = await self.db.stores.find(
+            query, {"name": 1, "image_url": 1, "active_user_count": 1}
+        ).sort("_id", 1).limit(first + 1).to_list(length=None)
+
+        has_next_page = len(stores) > first
+        stores = stores[:first]
+        for store in stores:
             store["id"] = str(store["_id"])
-            # Fetch widget domain if widget is installed
-            if store.get("installed_widget_id"):
-                widget = await self.db.widget_configs.find_one({
-                    "_id": ObjectId(store.get("installed_widget_id"))
-                })
-                if widget:
-                    store["installed_widget_domain"] = widget.get("domain")
+        return stores, has_next_page
+
+
+    async def get_store_by_id(
+        self, store_id: str, projection: Optional[Dict[str, int]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Serve static fields from the catalog cache and read only live fields."""
+        cached = catalog_cache.get(store_id)
+        if cached is None:
+            generation = catalog_cache.invalidations
+            store = await self.db.stores.find_one({"_id": ObjectId(store_id)})
+            if store:
+                catalog_cache.put(store_id, store, generation)
+                store["id"] = str(store["_id"])
+            return store
+
+        live_projection = _live_projection(projection)
+        if live_projection is None:
+            store = cached
+        else:
+            live = await self.db.stores.find_one({"_id": ObjectId(store_id)}, live_projection)
+            if not live:
+                catalog_cache.invalidate(store_id)
+                return None
+            store = _merge_live(cached, live)
+        store["id"] = store_id
         return store
 
 
-    async def _cleanup_stale_sessions(self, store_id: ObjectId):
-        five_minutes_ago = datetime.utcnow() - timedelta(minutes=5)
-        result = await self.db.stores.update_one(
-            {"_id": store_id},
-            {
-                "$pull": {"active_sessions": {"last_heartbeat": {"$lt": five_minutes_ago}}},
-                "$set": {"updated_at": datetime.utcnow()}
-            }
+    async def sweep_stale_sessions(self) -> int:
+        """Expire stale sessions and repair occupancy counters.
+
+        Expired sessions are ended one by one so each gives its slot back
+        exactly once. The TTL index on store_sessions removes expired sessions
+        on its own without touching active_user_count, so counters are then
+        lowered to the number of sessions left wherever they are higher.
+
+        Entrants write their session before taking a slot and exits give the
+        slot back before deleting theirs, so the session count never drops
+        below the slots actually held. Counters are never raised from it: the
+        count also includes entrants that are about to be turned away.
+        """
+        cutoff = _session_cutoff()
+        now = datetime.utcnow()
+        expired = await self.db.store_sessions.find(
+            {"last_heartbeat": {"$lt": cutoff}, "state": {"$exists": False}},
+            {"store_id": 1}
+        ).to_list(length=None)
+        changed = set()
+        for session in expired:
+            if await self._end_session(
+                session["store_id"], {"_id": session["_id"], "last_heartbeat": {"$lt": cutoff}}
+            ):
+                changed.add(session["store_id"])
+        # Entries or exits abandoned half way by a process that died
+        await self.db.store_sessions.delete_many(
+            {"last_heartbeat": {"$lt": cutoff}, "state": {"$exists": True}}
         )
-        
-        store = await self.db.stores.find_one({"_id": store_id})
-        if store:
-            active_sessions = store.get("active_sessions", [])
-            unique_users = len(set(str(s["user_id"]) for s in active_sessions))
-            
-            if unique_users != store.get("active_user_count", 0):
-                await self.db.stores.update_one(
-                    {"_id": store_id},
-                    {"$set": {"active_user_count": unique_users}}
+
+        # Counters are read before sessions are counted; see the docstring
+        stores = await self.db.stores.find({}, {"active_user_count": 1}).to_list(length=None)
+        live_counts = await self.db.store_sessions.aggregate([
+            {"$group": {"_id": "$store_id", "count": {"$sum": 1}}}
+        ]).to_list(length=None)
+        counts = {c["_id"]: c["count"] for c in live_counts}
+
+        drifted = [
+            store for store in stores
+            if store.get("active_user_count", 0) > counts.get(store["_id"], 0)
+        ]
+        if drifted:
+            await self.db.stores.bulk_write([
+                UpdateOne(
+                    # Skip stores whose counter moved since we read it
+                    {"_id": store["_id"], "active_user_count": store.get("active_user_count")},
+                    {"$set": {"active_user_count": counts.get(store["_id"], 0), "updated_at": now}}
                 )
+                for store in drifted
+            ], ordered=False)
+            changed.update(store["_id"] for store in drifted)
+        for store_oid in changed:
+            store_events.notify_write(str(store_oid), "occupancy")
+        return len(changed)
 
 
-    async def enter_store(self, store_id: str, user_id: str) -> tuple[bool, str]:
-    
-        await self._cleanup_stale_sessions(ObjectId(store_id))
-        
-        store = await self.db.stores.find_one({"_id": ObjectId(store_id)})
-        if not store:
-            return False, "Store not found"
-        
-        active_sessions = store.get("active_sessions", [])
-        
-        existing_session = next(
-            (s for s in active_sessions if str(s["user_id"]) == str(user_id)),
-            None
+    async def _reserve_slot(self, store_oid: ObjectId) -> Optional[Dict[str, Any]]:
+        return await self.db.stores.find_one_and_update(
+            {"_id": store_oid, "active_user_count": {"$lt": settings.STORE_MAX_USERS}},
+            {"$inc": {"active_user_count": 1}, "$set": {"updated_at": datetime.utcnow()}},
+            projection={"_id": 1}
         )
-        if existing_session:
-            return True, existing_session["session_id"]
-        
-        unique_user_ids = set(str(s["user_id"]) for s in active_sessions)
-        
-        if len(unique_user_ids) >= 2:
-            return False, "Store is full - maximum 2 users allowed"
-        
-        session_id = str(uuid.uuid4())
-        new_session = {
-            "session_id": session_id,
-            "user_id": user_id,
-            "entered_at": datetime.utcnow(),
-            "last_heartbeat": datetime.utcnow()
-        }
-        
+
+
+    async def _release_slot(self, store_oid: ObjectId):
         await self.db.stores.update_one(
-            {"_id": ObjectId(store_id)},
-            {
-                "$push": {"active_sessions": new_session},
-                "$set": {"updated_at": datetime.utcnow()}
-            }
+            {"_id": store_oid, "active_user_count": {"$gt": 0}},
+            {"$inc": {"active_user_count": -1}, "$set": {"updated_at": datetime.utcnow()}}
         )
-        
-        updated_store = await self.db.stores.find_one({"_id": ObjectId(store_id)})
-        if updated_store:
-            active_sessions = updated_store.get("active_sessions", [])
-            unique_users = len(set(str(s["user_id"]) for s in active_sessions))
-            await self.db.stores.update_one(
-                {"_id": ObjectId(store_id)},
-                {"$set": {"active_user_count": unique_users}}
+
+
+    async def enter_store(self, store_id: str, user_id: str) -> tuple[bool, str]:
+        """Admit a user into a store.
+
+        Capacity is enforced by a conditional $inc on the store's
+        active_user_count, and the unique (store_id, user_id) index on
+        store_sessions keeps one session per user. A user's session document
+        holds their slot until it is deleted, so re-entering reuses it, even
+        after it expired, without touching the counter.
+        """
+        store_oid = ObjectId(store_id)
+
+        for attempt in range(ENTRY_ATTEMPTS):
+            now = datetime.utcnow()
+            existing = await self.db.store_sessions.find_one_and_update(
+                {"store_id": store_oid, "user_id": user_id, "state": {"$exists": False}},
+                {"$set": {"last_heartbeat": now}},
+                projection={"session_id": 1}
             )
-        
-        return True, session_id
+            if existing:
+                return True, existing["session_id"]
 
+            # The session is written before the slot is taken so that a recount
+            # running in between counts it rather than handing its slot out again
+            session_id = str(uuid.uuid4())
+            try:
+                await self.db.store_sessions.insert_one({
+                    "session_id": session_id,
+                    "store_id": store_oid,
+                    "user_id": user_id,
+                    "entered_at": now,
+                    "last_heartbeat": now,
+                    "state": "entering"
+                })
+            except DuplicateKeyError:
+                # Another entry or an exit for the same user is in flight
+                await asyncio.sleep(ENTRY_RETRY_SECONDS * attempt)
+                continue
 
-    async def exit_store(self, store_id: str, session_id: str) -> bool:
-        result = await self.db.stores.update_one(
-            {"_id": ObjectId(store_id)},
-            {
-                "$pull": {"active_sessions": {"session_id": session_id}},
-                "$set": {"updated_at": datetime.utcnow()}
-            }
-        )
-        
-        store = await self.db.stores.find_one({"_id": ObjectId(store_id)})
-        if store:
-            active_sessions = store.get("active_sessions", [])
-            unique_users = len(set(str(s["user_id"]) for s in active_sessions))
-            await self.db.stores.update_one(
-                {"_id": ObjectId(store_id)},
-                {"$set": {"active_user_count": unique_users}}
+            reserved = await self._reserve_slot(store_oid)
+            if not reserved and await self._end_session(
+                store_oid, {"last_heartbeat": {"$lt": _session_cutoff()}}
+            ):
+                # An expired session the sweeper had not reached yet gave its slot back
+                reserved = await self._reserve_slot(store_oid)
+            if not reserved:
+                await self.db.store_sessions.delete_one({"session_id": session_id})
+                exists = await self.db.stores.find_one({"_id": store_oid}, {"_id": 1})
+                if not exists:
+                    return False, "Store not found"
+                return False, f"Store is full - maximum {settings.STORE_MAX_USERS} users allowed"
+
+            await self.db.store_sessions.update_one(
+                {"session_id": session_id}, {"$unset": {"state": ""}}
             )
-            print(f"DEBUG: Exit store - removed session {session_id}, remaining unique users: {unique_users}")
-        
-        return result.modified_count > 0
+            store_events.notify_write(store_id, "occupancy")
+            return True, session_id
+
+        return False, "Another session for this user is being opened or closed - try again"
+
+
+    async def _end_session(self, store_oid: ObjectId, match: Dict[str, Any]) -> bool:
+        """Delete one session matching `match` and give its slot back.
+
+        The session is claimed first so only one caller releases the slot, and
+        the slot is released before the session disappears from a concurrent
+        recount. Claiming refreshes last_heartbeat so the TTL monitor and the
+        sweeper leave the session alone in between.
+        """
+        session = await self.db.store_sessions.find_one_and_update(
+            {"store_id": store_oid, "state": {"$exists": False}, **match},
+            {"$set": {"state": "exiting", "last_heartbeat": datetime.utcnow()}},
+            projection={"_id": 1}
+        )
+        if not session:
+            return False
+
+        await self._release_slot(store_oid)
+        await self.db.store_sessions.delete_one({"_id": session["_id"]})
+        return True
+
+
+    async def exit_store(self, store_id: str, session_id: str) -> bool:
+        if not await self._end_session(ObjectId(store_id), {"session_id": session_id}):
+            return False
+        store_events.notify_write(store_id, "occupancy")
+        return True
 
 
     async def heartbeat(self, store_id: str, session_id: str) -> bool:
-        result = await self.db.stores.update_one(
-            {"_id": ObjectId(store_id), "active_sessions.session_id": session_id},
-            {
-                "$set": {"active_sessions.$.last_heartbeat": datetime.utcnow()}
-            }
+        result = await self.db.store_sessions.update_one(
+            {"store_id": ObjectId(store_id), "session_id": session_id, "state": {"$exists": False}},
+            {"$set": {"last_heartbeat": datetime.utcnow()}}
         )
-        return result.modified_count > 0
+        return result.matched_count > 0
 
 
     async def update_model_position(
-        self, store_id: str, model_name: str, new_position: list, user_id: str
-    ) -> tuple[bool, str]:
+        self,
+        store_id: str,
+        model_name: str,
+        new_position: list,
+        user_id: str,
+        expected_version: Optional[int] = None
+    ) -> tuple[bool, str, Optional[Dict[str, Any]]]:
+        """Move one model; returns (moved, message, model).
+
+        model is the model's current state, also on a version conflict, so
+        the caller can reconcile without reading the store again.
+        """
+        result = await self.update_model_positions(
+            store_id,
+            [{"name": model_name, "position": new_position, "expected_version": expected_version}],
+            user_id
+        )
+        if result is None:
+            return False, "Store not found", None
+        moved, conflicts = result
+        if moved:
+            return True, "Position updated", moved[0]
+        if conflicts:
+            current = conflicts[0].get("version", 0)
+            return False, f"Version conflict - current version is {current}", conflicts[0]
+        return False, "Model not found", None
+
+
+    async def update_model_positions(
+        self, store_id: str, moves: List[Dict[str, Any]], user_id: str
+    ) -> Optional[tuple[List[Dict[str, Any]], List[Dict[str, Any]]]]:
+        """Apply several model moves in one arrayFilters update.
+
+        A move carrying expected_version only applies while the model is still
+        at that version. Returns (moved, conflicts) with the current state of
+        each model, or None if the store does not exist.
+        """
         now = datetime.utcnow()
-        
-        result = await self.db.stores.update_one(
-            {
-                "_id": ObjectId(store_id),
-                "models.name": model_name
+        # Mongo stores milliseconds; truncate so our own writes can be recognised
+        now = now.replace(microsecond=now.microsecond // 1000 * 1000)
+        # Last move wins when the same model appears more than once
+        moves_by_name = {move["name"]: move for move in moves}
+
+        set_fields: Dict[str, Any] = {"updated_at": now}
+        inc_fields: Dict[str, int] = {}
+        array_filters = []
+        for i, (name, move) in enumerate(moves_by_name.items()):
+            set_fields[f"models.$[m{i}].position"] = move["position"]
+            set_fields[f"models.$[m{i}].last_moved_by"] = user_id
+            set_fields[f"models.$[m{i}].last_moved_at"] = now
+            inc_fields[f"models.$[m{i}].version"] = 1
+            array_filter = {f"m{i}.name": name}
+            if move.get("expected_version") is not None:
+                array_filter[f"m{i}.version"] = move["expected_version"]
+            array_filters.append(array_filter)
+
+        catalog_cache.invalidate(store_id)
+        store = await self.db.stores.find_one_and_update(
+            {"_id": ObjectId(store_id)},
+            {"$set": set_fields, "$inc": inc_fields},
+            array_filters=array_filters,
+            projection={
+                "models.name": 1,
+                "models.position": 1,
+                "models.version": 1,
+                "models.last_moved_by": 1,
+                "models.last_moved_at": 1
             },
-            {
-                "$set": {
-                    "models.$.position": new_position,
-                    "models.$.last_moved_by": user_id,
-                    "models.$.last_moved_at": now,
-                    "updated_at": now
-                }
-            }
+            return_document=ReturnDocument.AFTER
         )
-        
-        if result.modified_count > 0:
-            return True, "Position updated"
-        else:
-            return False, "Model not found"
+        if not store:
+            return None
+
+        moved, conflicts = [], []
+        for model in store.get("models", []):
+            move = moves_by_name.get(model.get("name"))
+            if move is None:
+                continue
+            expected = move.get("expected_version")
+            if expected is None or (
+                model.get("version") == expected + 1 and model.get("last_moved_at") == now
+            ):
+                moved.append(model)
+            else:
+                conflicts.append(model)
+        if moved:
+            store_events.notify_write(store_id, "models", names=[m["name"] for m in moved])
+        return moved, conflicts
 
 
-    async def install_widget(self, store_id: str, widget_id: str) -> Optional[Dict[str, Any]]:
+    async def install_widget(
+        self,
+        store_id: str,
+        widget_id: str,
+        projection: Optional[Dict[str, int]] = None
+    ) -> Optional[Dict[str, Any]]:
         try:
             store_oid = None
             
@@ -186,6 +391,7 @@ class StoreService:
                     else:
                         return None
             
+            catalog_cache.invalidate(str(store_oid))
             result = await self.db.stores.update_one(
                 {"_id": store_oid},
                 {
@@ -197,7 +403,10 @@ class StoreService:
             )
             
             if result.modified_count > 0:
-                store = await self.db.stores.find_one({"_id": store_oid})
+                # A read during the write may have re-cached the old document
+                catalog_cache.invalidate(str(store_oid))
+                store_events.notify_write(str(store_oid), "widget")
+                store = await self.db.stores.find_one({"_id": store_oid}, projection)
                 if store:
                     store["id"] = str(store["_id"])
                 return store
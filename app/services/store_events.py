@@ -0,0 +1,243 @@
+import asyncio
+import time
+from typing import Any, Callable, Dict, Optional, Set
+from core.config import settings
+from services.broadcast import BroadcastBackend
+from services.catalog_cache import catalog_cache
+from services.metrics import (
+    subscription_dropped_events,
+    subscription_max_queue_depth,
+    subscription_queued_events,
+    subscription_slow_disconnects,
+    subscription_stalled,
+    subscription_subscribers,
+)
+
+CHANNEL_PREFIX = "store:"
+# Event kinds published by writes to fields the catalog cache serves
+STATIC_EVENT_KINDS = {"widget"}
+# Close code for a connection whose stalled subscription never resumed: Try Again Later
+SLOW_CONSUMER_CLOSE_CODE = 1013
+CLOSE_TIMEOUT_SECONDS = 5
+
+
+class SlowConsumerError(Exception):
+    """Raised inside a subscription that fell too far behind, which ends it."""
+
+
+class StoreSubscriber:
+    """Bounded event queue of one subscription.
+
+    Events only tell the consumer to re-read the store, so when the queue is
+    full the oldest pending event is dropped and the latest one kept.
+    """
+
+    def __init__(self, store_id: str, maxsize: int, connection: Any = None):
+        self.store_id = store_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        # The websocket carrying the subscription, closed if it stays stalled
+        self.connection = connection
+        # When the oldest event still waiting for the consumer was queued
+        self.pending_since: Optional[float] = None
+        # When the subscriber was dropped for falling behind
+        self.stalled_at: Optional[float] = None
+        self.dropped = 0
+
+    def offer(self, event: Dict[str, Any]) -> bool:
+        """Queue an event, dropping the oldest one if full; False if it had to drop."""
+        if self.pending_since is None:
+            self.pending_since = time.monotonic()
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.queue.put_nowait(event)
+            self.dropped += 1
+            return False
+        self.queue.put_nowait(event)
+        return True
+
+    def is_stalled(self, deadline: float) -> bool:
+        return (
+            self.pending_since is not None
+            and time.monotonic() - self.pending_since > deadline
+        )
+
+    async def next_event(self) -> Dict[str, Any]:
+        """Wait for an event and return the latest of those queued.
+
+        Raises SlowConsumerError once the subscriber has been dropped, so the
+        client gets an error and a complete message for the operation.
+        """
+        if self.stalled_at is not None:
+            raise SlowConsumerError("Subscription dropped: the client fell too far behind")
+        event = await self.queue.get()
+        while not self.queue.empty():
+            event = self.queue.get_nowait()
+        self.pending_since = None
+        return event
+
+
+class StoreEventHub:
+    """Broadcast of store changes to subscription queues, keyed by store id.
+
+    Events are delivered to local subscribers and, through the broadcast
+    backend, to subscribers on every other app process.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[str, Set[StoreSubscriber]] = {}
+        self.backend: Optional[BroadcastBackend] = None
+        # Other channels relayed over the same backend, by channel prefix
+        self._channels: Dict[str, Callable[[str, Dict[str, Any]], None]] = {}
+        # Set while a change stream reports every write to `stores`
+        self.watching_database = False
+        self.dropped_events = 0
+        self.slow_disconnects = 0
+        # Dropped subscribers whose generator has not come back to end itself yet
+        self._stalled: Set[StoreSubscriber] = set()
+        self._watchdog: Optional[asyncio.Task] = None
+
+    async def connect(self, backend: BroadcastBackend):
+        self.backend = backend
+        await backend.connect(self._on_remote_message)
+        self._watchdog = asyncio.create_task(self._watch_stalls())
+
+    async def disconnect(self):
+        if self._watchdog is not None:
+            self._watchdog.cancel()
+            try:
+                await self._watchdog
+            except asyncio.CancelledError:
+                pass
+            self._watchdog = None
+        if self.backend is not None:
+            await self.backend.disconnect()
+            self.backend = None
+
+    def add_channel(self, prefix: str, handler: Callable[[str, Dict[str, Any]], None]):
+        self._channels[prefix] = handler
+
+    def relay(self, channel: str, message: Dict[str, Any]):
+        """Send a message on an added channel to the other app processes."""
+        if self.backend is not None:
+            self.backend.publish(channel, message)
+
+    def _on_remote_message(self, channel: str, event: Dict[str, Any]):
+        if channel.startswith(CHANNEL_PREFIX):
+            if event.get("kind") in STATIC_EVENT_KINDS:
+                # Another process changed what this one's catalog cache holds
+                catalog_cache.invalidate(event["store_id"])
+            self.deliver(event)
+            return
+        for prefix, handler in self._channels.items():
+            if channel.startswith(prefix):
+                handler(channel, event)
+
+    def subscribe(self, store_id: str, connection: Any = None) -> StoreSubscriber:
+        subscriber = StoreSubscriber(store_id, settings.SUBSCRIPTION_QUEUE_SIZE, connection)
+        self._subscribers.setdefault(store_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, store_id: str, subscriber: StoreSubscriber):
+        self._stalled.discard(subscriber)
+        subscribers = self._subscribers.get(store_id)
+        if subscribers is None:
+            return
+        subscribers.discard(subscriber)
+        if not subscribers:
+            del self._subscribers[store_id]
+
+    def _disconnect_slow(self, subscriber: StoreSubscriber):
+        print(
+            f"✗ Dropping slow subscriber on store {subscriber.store_id} "
+            f"({subscriber.dropped} events coalesced)"
+        )
+        self.unsubscribe(subscriber.store_id, subscriber)
+        self.slow_disconnects += 1
+        subscription_slow_disconnects.inc()
+        # The generator raises on its next read; until then it is watched
+        subscriber.stalled_at = time.monotonic()
+        self._stalled.add(subscriber)
+
+    async def _close_connection(self, subscriber: StoreSubscriber):
+        print(f"✗ Closing connection of stalled subscriber on store {subscriber.store_id}")
+        try:
+            # Closing can block on the same stuck socket, so do not wait forever
+            await asyncio.wait_for(
+                subscriber.connection.close(code=SLOW_CONSUMER_CLOSE_CODE),
+                timeout=CLOSE_TIMEOUT_SECONDS
+            )
+        except Exception as e:
+            print(f"✗ Failed to close stalled connection: {e}")
+
+    async def _watch_stalls(self):
+        """Find stalled subscribers even when no new event arrives for their store.
+
+        A dropped subscriber normally ends itself on its next read. One still
+        stuck a full deadline later, e.g. in a send the client never reads,
+        has its websocket closed instead.
+        """
+        deadline = settings.SUBSCRIPTION_SLOW_CONSUMER_SECONDS
+        while True:
+            await asyncio.sleep(max(deadline / 2, 0.1))
+            for subscribers in list(self._subscribers.values()):
+                for subscriber in list(subscribers):
+                    if subscriber.is_stalled(deadline):
+                        self._disconnect_slow(subscriber)
+
+            now = time.monotonic()
+            for subscriber in list(self._stalled):
+                if now - subscriber.stalled_at > deadline:
+                    self._stalled.discard(subscriber)
+                    if subscriber.connection is not None:
+                        await self._close_connection(subscriber)
+
+    def deliver(self, event: Dict[str, Any]):
+        """Hand an event to this process's subscribers only."""
+        deadline = settings.SUBSCRIPTION_SLOW_CONSUMER_SECONDS
+        for subscriber in list(self._subscribers.get(event["store_id"], ())):
+            if subscriber.is_stalled(deadline):
+                self._disconnect_slow(subscriber)
+                continue
+            if not subscriber.offer(event):
+                self.dropped_events += 1
+                subscription_dropped_events.inc()
+
+    def publish(self, store_id: str, kind: str, **payload: Any):
+        event = {"store_id": store_id, "kind": kind, **payload}
+        self.deliver(event)
+        if self.backend is not None:
+            self.backend.publish(f"{CHANNEL_PREFIX}{store_id}", event)
+
+    def notify_write(self, store_id: str, kind: str, **payload: Any):
+        """Publish a write made by this process unless the change stream will report it."""
+        if not self.watching_database:
+            self.publish(store_id, kind, **payload)
+
+    def subscriber_count(self, store_id: str) -> int:
+        return len(self._subscribers.get(store_id, ()))
+
+    def stats(self) -> Dict[str, Any]:
+        depths = [
+            subscriber.queue.qsize()
+            for subscribers in self._subscribers.values()
+            for subscriber in subscribers
+        ]
+        return {
+            "subscribers": len(depths),
+            "queued_events": sum(depths),
+            "max_queue_depth": max(depths, default=0),
+            "dropped_events": self.dropped_events,
+            "slow_disconnects": self.slow_disconnects,
+            "stalled_subscribers": len(self._stalled)
+        }
+
+    def export_metrics(self):
+        """Refresh the subscription gauges; called when /metrics is scraped."""
+        stats = self.stats()
+        subscription_subscribers.set(stats["subscribers"])
+        subscription_queued_events.set(stats["queued_events"])
+        subscription_max_queue_depth.set(stats["max_queue_depth"])
+        subscription_stalled.set(stats["stalled_subscribers"])
+
+
+store_events = StoreEventHub()
@@ -0,0 +1,163 @@
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+from pymongo.errors import OperationFailure
+from services.catalog_cache import catalog_cache, STATIC_STORE_FIELDS, STATIC_MODEL_FIELDS
+from services.store_events import store_events
+from core.config import settings
+
+# Server error codes that mean change streams are not usable here
+CHANGE_STREAMS_UNSUPPORTED = {40573, 136}
+CHANGE_STREAM_HISTORY_LOST = 286
+# Backoff between attempts to reopen an interrupted change stream
+RETRY_MIN_SECONDS = 0.5
+RETRY_MAX_SECONDS = 30
+TOKEN_ID = "stores"
+
+
+def _touches_static_fields(change: Dict[str, Any]) -> bool:
+    """Whether a change may alter what the catalog cache holds for the store."""
+    if change["operationType"] != "update":
+        return True
+    description = change.get("updateDescription") or {}
+    paths = list(description.get("updatedFields") or {}) + list(description.get("removedFields") or [])
+    for path in paths:
+        parts = path.split(".")
+        if parts[0] in STATIC_STORE_FIELDS:
+            return True
+        # "models" or "models.3" replace whole models; "models.3.position" one field
+        if parts[0] == "models" and (len(parts) < 3 or parts[2] in STATIC_MODEL_FIELDS):
+            return True
+    return False
+
+
+class StoreChangeWatcher:
+    """One change stream on `stores` per process, fanned out to subscribers by _id.
+
+    Falls back to polling `updated_at` when the server is not a replica set;
+    any other failure reopens the stream from the last resume token.
+    """
+
+    def __init__(self):
+        self.db = None
+        self.mode: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+        self._resume_token = None
+        self._token_saved_at = 0.0
+
+    def set_db(self, db):
+        self.db = db
+
+    async def _load_resume_token(self):
+        doc = await self.db.change_stream_tokens.find_one({"_id": TOKEN_ID})
+        return doc.get("token") if doc else None
+
+    async def _save_resume_token(self, force: bool = False):
+        if self._resume_token is None:
+            return
+        if not force and time.monotonic() - self._token_saved_at < settings.CHANGE_STREAM_TOKEN_SAVE_SECONDS:
+            return
+        await self.db.change_stream_tokens.update_one(
+            {"_id": TOKEN_ID},
+            {"$set": {"token": self._resume_token, "updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+        self._token_saved_at = time.monotonic()
+
+    async def _watch(self):
+        resume_after = await self._load_resume_token()
+        pipeline = [
+            {"$match": {"operationType": {"$in": ["insert", "update", "replace", "delete"]}}},
+            {"$project": {
+                "documentKey": 1,
+                "operationType": 1,
+                "updateDescription.updatedFields": 1,
+                "updateDescription.removedFields": 1
+            }}
+        ]
+        delay = RETRY_MIN_SECONDS
+        while True:
+            try:
+                async with self.db.stores.watch(pipeline, resume_after=resume_after) as stream:
+                    self.mode = "change_stream"
+                    store_events.watching_database = True
+                    delay = RETRY_MIN_SECONDS
+                    print("✓ Watching stores change stream")
+                    async for change in stream:
+                        store_id = str(change["documentKey"]["_id"])
+                        if _touches_static_fields(change):
+                            catalog_cache.invalidate(store_id)
+                        # Every node runs its own stream, so this stays local
+                        store_events.deliver({"store_id": store_id, "kind": change["operationType"]})
+                        self._resume_token = stream.resume_token
+                        await self._save_resume_token()
+                # The stream ended without an error; reopen where it stopped
+                resume_after = self._resume_token
+                continue
+            except OperationFailure as e:
+                if e.code in CHANGE_STREAMS_UNSUPPORTED:
+                    raise
+                if e.code == CHANGE_STREAM_HISTORY_LOST:
+                    print("✗ Change stream resume token expired, restarting from now")
+                    resume_after = self._resume_token = None
+                    continue
+                error = e
+            except Exception as e:
+                # Elections, lost connections and server selection timeouts pass
+                error = e
+
+            # Until the stream is back, local writes publish their own events
+            store_events.watching_database = False
+            print(f"✗ Change stream interrupted ({error}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RETRY_MAX_SECONDS)
+            if self._resume_token is not None:
+                # Resume where we left off so writes made meanwhile are delivered
+                resume_after = self._resume_token
+
+
+    async def _poll(self):
+        self.mode = "polling"
+        store_events.watching_database = False
+        print("✓ Change streams unavailable, polling stores for updates")
+        last_seen = datetime.utcnow()
+        while True:
+            await asyncio.sleep(settings.STORE_POLL_INTERVAL_SECONDS)
+            try:
+                changed = await self.db.stores.find(
+                    {"updated_at": {"$gt": last_seen}}, {"updated_at": 1}
+                ).to_list(length=None)
+            except Exception as e:
+                print(f"✗ Store poll failed: {e}")
+                continue
+            for store in changed:
+                store_events.deliver({"store_id": str(store["_id"]), "kind": "update"})
+                last_seen = max(last_seen, store["updated_at"])
+
+    async def _run(self):
+        try:
+            await self._watch()
+        except OperationFailure:
+            # Not a replica set: _watch only lets these codes through
+            await self._poll()
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        store_events.watching_database = False
+        try:
+            await self._save_resume_token(force=True)
+        except Exception as e:
+            print(f"✗ Failed to persist change stream resume token: {e}")
+
+
+store_watcher = StoreChangeWatcher()
@@ -13,31 +13,31 @@ class WidgetService:
     def set_db(self, db):
         self.db = db
 
-    async def get_widget_by_domain(self, domain: str) -> Optional[dict]:
+    async def get_widget_by_domain(self, domain: str, projection: Optional[dict] = None) -> Optional[dict]:
         widget = await self.db.widget_configs.find_one({
             "domain": domain,
             "is_active": True
-        })
+        }, projection)
         return widget
     
-    async def get_widget_by_id(self, widget_id: str) -> Optional[dict]:
+    async def get_widget_by_id(self, widget_id: str, projection: Optional[dict] = None) -> Optional[dict]:
         widget = await self.db.widget_configs.find_one({
             "_id": ObjectId(widget_id)
-        })
+        }, projection)
         return widget
     
-    async def get_widgets_by_store(self, store_id: str) -> List[dict]:
+    async def get_widgets_by_store(self, store_id: str, projection: Optional[dict] = None) -> List[dict]:
         widgets = await self.db.widget_configs.find({
             "store_id": store_id,
             "is_active": True
-        }).to_list(length=None)
+        }, projection).to_list(length=None)
         return widgets
     
-    async def get_all_widgets(self) -> List[dict]:
+    async def get_all_widgets(self, projection: Optional[dict] = None) -> List[dict]:
         """Get all active widgets from all stores"""
         widgets = await self.db.widget_configs.find({
             "is_active": True
-        }).to_list(length=None)
+        }, projection).to_list(length=None)
         return widgets
     
     async def create_widget(
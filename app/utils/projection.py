@@ -0,0 +1,60 @@
+import re
+from typing import Dict, Optional, Set
+from strawberry.types.nodes import SelectedField
+
+
+_CAMEL_BOUNDARY = re.compile(r"(?<!^)(?=[A-Z])")
+
+
+def to_snake_case(name: str) -> str:
+    return _CAMEL_BOUNDARY.sub("_", name).lower()
+
+
+def _collect(selections, prefix: str, paths: Set[str]):
+    for selection in selections:
+        if isinstance(selection, SelectedField):
+            if selection.name.startswith("__"):
+                continue
+            path = f"{prefix}{selection.name}"
+            if selection.selections:
+                _collect(selection.selections, f"{path}.", paths)
+            else:
+                paths.add(path)
+        else:
+            # Fragment spreads and inline fragments
+            _collect(selection.selections, prefix, paths)
+
+
+def selected_paths(info) -> Set[str]:
+    """Leaf paths selected under the current field, e.g. {"name", "models.glbUrl"}."""
+    paths: Set[str] = set()
+    for field in info.selected_fields:
+        _collect(field.selections, "", paths)
+    return paths
+
+
+def build_projection(
+    paths: Set[str], field_map: Optional[Dict[str, Optional[str]]] = None
+) -> Dict[str, int]:
+    """Translate GraphQL selection paths into a MongoDB projection.
+
+    field_map overrides the default camelCase -> snake_case mapping for a
+    GraphQL path; mapping to None means the field is not read from the document.
+    """
+    field_map = field_map or {}
+    projection = {}
+    for path in paths:
+        if path in field_map:
+            doc_path = field_map[path]
+        else:
+            doc_path = ".".join(to_snake_case(part) for part in path.split("."))
+        if doc_path:
+            projection[doc_path] = 1
+
+    # A parent path makes any of its sub-paths redundant and MongoDB rejects both
+    projection = {
+        path: 1 for path in projection
+        if not any(path.startswith(f"{other}.") for other in projection)
+    }
+    # An empty projection would return the whole document
+    return projection or {"_id": 1}
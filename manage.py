@@ -2,6 +2,8 @@
   python manage.py migrate        - Run all pending migrations
   python manage.py migrate:status - Show migration status
   python manage.py status         - Check database status
+  python manage.py stress:enter <store_id> [count] - Concurrent enterStore capacity check
+  python manage.py indexes [--apply] - Diff the index registry against the database
 """
 import asyncio
 import sys
@@ -9,8 +11,10 @@ import logging
 from pathlib import Path
 import os
 import datetime
+import uuid
 # import importlib.util
 from pymongo import MongoClient
+from bson.objectid import ObjectId
 
 # Add current directory to path
 sys.path.insert(0, str(Path(__file__).parent))
@@ -181,9 +185,9 @@ def check_status():
                 logger.info(f"  - Models in sample: {len(models)}")
         
         # Get sessions info
-        if "sessions" in collections:
-            sessions_count = db_connection.sessions.count_documents({})
-            logger.info(f"\nSessions collection:")
+        if "store_sessions" in collections:
+            sessions_count = db_connection.store_sessions.count_documents({})
+            logger.info(f"\nStore sessions collection:")
             logger.info(f"  - Active sessions: {sessions_count}")
         
         # Get users info
@@ -200,6 +204,91 @@ def check_status():
         sys.exit(1)
 
 
+async def stress_enter_store(store_id: str, count: int):
+    """Fire `count` simultaneous enterStore mutations and verify the cap holds."""
+    logger.info("=" * 60)
+    logger.info(f"Stress testing enterStore with {count} concurrent users")
+    logger.info("=" * 60)
+
+    sys.path.insert(0, str(Path(__file__).parent / "app"))
+    import db.mongo as mongo_module
+    from api.schema import combined_schema
+    from core.config import settings
+    from services.store import store_service
+
+    mutation = """
+        mutation Enter($storeId: String!, $userId: String!) {
+            enterStore(storeId: $storeId, userId: $userId) { sessionId activeUserCount }
+        }
+    """
+
+    await mongo_module.connect_to_mongo()
+    store_service.set_db(mongo_module.db)
+    user_ids = [f"stress-{uuid.uuid4()}" for _ in range(count)]
+    try:
+        results = await asyncio.gather(*(
+            combined_schema.execute(
+                mutation, variable_values={"storeId": store_id, "userId": user_id}
+            )
+            for user_id in user_ids
+        ))
+        admitted = [r for r in results if not r.errors]
+        rejected = len(results) - len(admitted)
+
+        unique_users = len(await mongo_module.db.store_sessions.distinct(
+            "user_id", {"store_id": ObjectId(store_id)}
+        ))
+
+        logger.info(f"  - Admitted: {len(admitted)}")
+        logger.info(f"  - Rejected: {rejected}")
+        logger.info(f"  - Distinct users in store: {unique_users} (cap {settings.STORE_MAX_USERS})")
+    finally:
+        await mongo_module.db.store_sessions.delete_many({"user_id": {"$in": user_ids}})
+        await store_service.sweep_stale_sessions()
+        await mongo_module.close_mongo_connection()
+
+    if unique_users > settings.STORE_MAX_USERS:
+        logger.error("✗ Capacity exceeded - store over-admitted users")
+        sys.exit(1)
+    logger.info("✓ Capacity held under concurrent entry")
+    logger.info("=" * 60)
+
+
+async def sync_indexes(apply: bool):
+    """Diff the declared indexes against the database, creating missing ones with --apply."""
+    logger.info("=" * 60)
+    logger.info("Index Status")
+    logger.info("=" * 60)
+
+    sys.path.insert(0, str(Path(__file__).parent / "app"))
+    import db.mongo as mongo_module
+    from db.indexes import INDEXES, apply_indexes, diff_indexes, print_drift
+
+    await mongo_module.connect_to_mongo()
+    try:
+        report = await diff_indexes(mongo_module.db)
+        for entry in report["missing"]:
+            logger.info(f"  + {entry['collection']}.{entry['name']}")
+        if apply and (report["missing"] or report["changed"]):
+            await apply_indexes(mongo_module.db, report)
+            report = await diff_indexes(mongo_module.db)
+        print_drift(report)
+    finally:
+        await mongo_module.close_mongo_connection()
+
+    managed = sum(len(models) for models in INDEXES.values())
+    logger.info(f"  - Managed: {managed}")
+    logger.info(f"  - Missing: {len(report['missing'])}")
+    logger.info(f"  - Drifted: {len(report['changed'])}")
+    logger.info(f"  - Unmanaged: {len(report['unmanaged'])}")
+    logger.info("=" * 60)
+    if report["missing"] or report["changed"]:
+        if not apply:
+            logger.info("Run 'python manage.py indexes --apply' to create missing indexes")
+        sys.exit(1)
+    logger.info("✓ Indexes match the registry")
+
+
 def main():
     if len(sys.argv) < 2:
         logger.info("Usage: python manage.py <command>")
@@ -207,6 +296,8 @@ def main():
         logger.info("  migrate        - Run all pending migrations")
         logger.info("  migrate:status - Show migration history")
         logger.info("  status         - Check database status")
+        logger.info("  stress:enter   - Concurrent enterStore capacity check")
+        logger.info("  indexes        - Diff declared indexes (--apply to create missing)")
         sys.exit(1)
     
     command = sys.argv[1]
@@ -221,6 +312,14 @@ def main():
         logger.info("Reset command not yet implemented")
     elif command == "status":
         check_status()
+    elif command == "stress:enter":
+        if len(sys.argv) < 3:
+            logger.error("Usage: python manage.py stress:enter <store_id> [count]")
+            sys.exit(1)
+        count = int(sys.argv[3]) if len(sys.argv) > 3 else 500
+        asyncio.run(stress_enter_store(sys.argv[2], count))
+    elif command == "indexes":
+        asyncio.run(sync_indexes("--apply" in sys.argv[2:]))
     else:
         logger.error(f"Unknown command: {command}")
         sys.exit(1)
@@ -0,0 +1,100 @@
+"""
+Migration: Move active sessions into a dedicated store_sessions collection
+Heartbeats then touch a small presence document instead of the store document.
+"""
+import os
+from datetime import datetime
+
+SESSION_TIMEOUT_MINUTES = int(os.getenv("SESSION_TIMEOUT_MINUTES", "5"))
+
+
+def upgrade(db):
+    """Create store_sessions with TTL expiry and move embedded sessions over"""
+    existing = db.list_collection_names()
+
+    if "store_sessions" not in existing:
+        db.create_collection(
+            "store_sessions",
+            validator={
+                "$jsonSchema": {
+                    "bsonType": "object",
+                    "required": ["session_id", "store_id", "user_id", "last_heartbeat"],
+                    "properties": {
+                        "_id": {"bsonType": "objectId"},
+                        "session_id": {"bsonType": "string"},
+                        "store_id": {"bsonType": "objectId"},
+                        "user_id": {"bsonType": "string"},
+                        "entered_at": {"bsonType": "date"},
+                        "last_heartbeat": {"bsonType": "date"}
+                    }
+                }
+            }
+        )
+        print("✓ Created store_sessions collection")
+
+    # Create indexes
+    db.store_sessions.create_index([("store_id", 1), ("user_id", 1)], unique=True)
+    db.store_sessions.create_index("session_id", unique=True)
+    db.store_sessions.create_index(
+        "last_heartbeat", expireAfterSeconds=SESSION_TIMEOUT_MINUTES * 60
+    )
+    print("✓ Created store_sessions indexes")
+
+    # Move embedded sessions, keeping the most recent session per user
+    moved = 0
+    for store in db.stores.find({"active_sessions": {"$exists": True}}):
+        latest = {}
+        for session in store.get("active_sessions", []):
+            user_id = str(session["user_id"])
+            current = latest.get(user_id)
+            if current is None or session["last_heartbeat"] > current["last_heartbeat"]:
+                latest[user_id] = session
+
+        for user_id, session in latest.items():
+            db.store_sessions.update_one(
+                {"store_id": store["_id"], "user_id": user_id},
+                {"$setOnInsert": {
+                    "session_id": session["session_id"],
+                    "entered_at": session.get("entered_at", session["last_heartbeat"]),
+                    "last_heartbeat": session["last_heartbeat"]
+                }},
+                upsert=True
+            )
+            moved += 1
+
+        db.stores.update_one(
+            {"_id": store["_id"]},
+            {
+                "$unset": {"active_sessions": ""},
+                "$set": {"active_user_count": len(latest), "updated_at": datetime.utcnow()}
+            }
+        )
+
+    print(f"✓ Moved {moved} session(s) to store_sessions")
+
+
+def downgrade(db):
+    """Move sessions back onto store documents and drop store_sessions"""
+    for store in db.stores.find({}, {"_id": 1}):
+        sessions = list(db.store_sessions.find({"store_id": store["_id"]}))
+        db.stores.update_one(
+            {"_id": store["_id"]},
+            {"$set": {
+                "active_sessions": [
+                    {
+                        "session_id": s["session_id"],
+                        "user_id": s["user_id"],
+                        "entered_at": s.get("entered_at"),
+                        "last_heartbeat": s["last_heartbeat"]
+                    }
+                    for s in sessions
+                ],
+                "active_user_count": len(sessions)
+            }}
+        )
+
+    try:
+        db.store_sessions.drop()
+        print("✓ Dropped store_sessions collection")
+    except:
+        pass
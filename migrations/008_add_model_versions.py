@@ -0,0 +1,22 @@
+def upgrade(db):
+    """
+    Add a monotonic 'version' to every model for optimistic concurrency.
+    Moves carrying expectedVersion only apply while the model is still at that version.
+    """
+    result = db.stores.update_many(
+        {"models": {"$elemMatch": {"version": {"$exists": False}}}},
+        {"$set": {"models.$[m].version": 0}},
+        array_filters=[{"m.version": {"$exists": False}}]
+    )
+
+    print(f"✓ Added model versions to {result.modified_count} store(s)")
+
+
+def downgrade(db):
+    """Remove model version fields"""
+    db.stores.update_many(
+        {},
+        {"$unset": {"models.$[].version": ""}}
+    )
+
+    print("✓ Removed model version fields")
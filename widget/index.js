@@ -48,34 +48,70 @@
     }
   }
 
-  async function trackEvent(storeId, domain, eventType) {
-    try {
-      console.log('[Widget] Tracking event:', { storeId, domain, eventType });
-      
-      const mutation = `
-        mutation {
-          trackEvent(
-            storeId: "${storeId}"
-            domain: "${domain}"
-            eventType: "${eventType}"
-            userAgent: "${navigator.userAgent}"
-            ipAddress: ""
-          )
-        }
-      `;
-
-      const response = await fetch(`${BACKEND_URL}/graphql`, {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ mutation }),
-      });
-
-      const data = await response.json();
-      if (data.errors) {
-        console.error('[Widget] Track error:', data.errors);
+  const TRACK_EVENT_MUTATION = `
+    mutation TrackEvent(
+      $storeId: String!
+      $domain: String!
+      $eventType: String!
+      $userAgent: String!
+      $ipAddress: String!
+    ) {
+      trackEvent(
+        storeId: $storeId
+        domain: $domain
+        eventType: $eventType
+        userAgent: $userAgent
+        ipAddress: $ipAddress
+      )
+    }
+  `;
+  // Events fired close together go out as one batched request
+  const BATCH_DELAY_MS = 50;
+  const MAX_BATCH_SIZE = 10;
+  let pendingEvents = [];
+  let flushTimer = null;
+
+  async function flushEvents() {
+    flushTimer = null;
+    const events = pendingEvents;
+    pendingEvents = [];
+
+    for (let i = 0; i < events.length; i += MAX_BATCH_SIZE) {
+      try {
+        const response = await fetch(`${BACKEND_URL}/graphql`, {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json' },
+          body: JSON.stringify(events.slice(i, i + MAX_BATCH_SIZE)),
+          keepalive: true,
+        });
+
+        const results = await response.json();
+        (Array.isArray(results) ? results : [results]).forEach((data) => {
+          if (data.errors) {
+            console.error('[Widget] Track error:', data.errors);
+          }
+        });
+      } catch (error) {
+        console.error('[Widget] Error tracking event:', error);
       }
-    } catch (error) {
-      console.error('[Widget] Error tracking event:', error);
+    }
+  }
+
+  function trackEvent(storeId, domain, eventType) {
+    console.log('[Widget] Tracking event:', { storeId, domain, eventType });
+
+    pendingEvents.push({
+      query: TRACK_EVENT_MUTATION,
+      variables: {
+        storeId,
+        domain,
+        eventType,
+        userAgent: navigator.userAgent,
+        ipAddress: '',
+      },
+    });
+    if (!flushTimer) {
+      flushTimer = setTimeout(flushEvents, BATCH_DELAY_MS);
     }
   }
 